@@ -0,0 +1,167 @@
+#! /usr/bin/python
+#
+# Arrival and service time distributions for the qsim engines.
+#
+# Variates are generated by NumPy a block at a time. The event by event engine
+# (qsim_heap.py) calls next() of a distribution to get the next variate, which
+# is taken from the current block and a new block is generated when it runs
+# out. next() is a partial of the builtin next on a chain of blocks, so taking
+# a variate runs no Python code except when a block is generated. The
+# vectorized engine (qsim_np.py) takes whole blocks with sample(). Every
+# distribution also knows its first two moments, for the Pollaczek-Khinchine
+# check of M/G/1 runs.
+#
+# usage: qdist.py [<replications>]      M/G/1 runs against Pollaczek-Khinchine
+
+import sys
+import functools
+import itertools
+import numpy as np
+
+# Variates generated at a time by next()
+BLOCK = 4096
+
+
+class Distribution(object):
+    def __init__(self, rng=None, block=BLOCK):
+        if rng is None:
+            rng = np.random.RandomState()
+        self.rng = rng
+        self.block = block
+        blocks = iter(self._new_block, None)
+        self.next = functools.partial(next, itertools.chain.from_iterable(blocks))
+
+    def _new_block(self):
+        return self.sample(self.block).tolist()
+
+    def __call__(self):
+        return self.next()
+
+    def sample(self, shape):
+        raise NotImplementedError
+
+    def mean(self):
+        raise NotImplementedError
+
+    def moment2(self):
+        # E[X^2]
+        raise NotImplementedError
+
+
+class Exponential(Distribution):
+    def __init__(self, rate, rng=None, block=BLOCK):
+        Distribution.__init__(self, rng, block)
+        self.rate = rate
+
+    def sample(self, shape):
+        return self.rng.exponential(1.0 / self.rate, shape)
+
+    def mean(self):
+        return 1.0 / self.rate
+
+    def moment2(self):
+        return 2.0 / self.rate**2
+
+
+class Deterministic(Distribution):
+    def __init__(self, value, rng=None, block=BLOCK):
+        Distribution.__init__(self, rng, block)
+        self.value = value
+
+    def sample(self, shape):
+        return np.full(shape, self.value, dtype=float)
+
+    def mean(self):
+        return self.value
+
+    def moment2(self):
+        return self.value**2
+
+
+class Erlang(Distribution):
+    # k exponential phases with a total mean of 1/rate, so it can replace
+    # Exponential(rate) without changing the load
+    def __init__(self, k, rate, rng=None, block=BLOCK):
+        Distribution.__init__(self, rng, block)
+        self.k = k
+        self.rate = rate
+
+    def sample(self, shape):
+        return self.rng.gamma(self.k, 1.0 / (self.k * self.rate), shape)
+
+    def mean(self):
+        return 1.0 / self.rate
+
+    def moment2(self):
+        return (self.k + 1.0) / (self.k * self.rate**2)
+
+
+class HyperExponential(Distribution):
+    # Exponential with rate rates[i] with probability probs[i]
+    def __init__(self, probs, rates, rng=None, block=BLOCK):
+        Distribution.__init__(self, rng, block)
+        self.probs = np.asarray(probs, dtype=float) / np.sum(probs)
+        self.rates = np.asarray(rates, dtype=float)
+
+    def sample(self, shape):
+        phase = self.rng.choice(len(self.rates), size=shape, p=self.probs)
+        return self.rng.exponential(1.0, shape) / self.rates[phase]
+
+    def mean(self):
+        return float(np.sum(self.probs / self.rates))
+
+    def moment2(self):
+        return float(np.sum(2.0 * self.probs / self.rates**2))
+
+
+class Empirical(Distribution):
+    # Draws with replacement from measured values
+    def __init__(self, values, rng=None, block=BLOCK):
+        Distribution.__init__(self, rng, block)
+        self.values = np.asarray(values, dtype=float).ravel()
+        if len(self.values) == 0:
+            raise ValueError("no values for an empirical distribution")
+
+    @classmethod
+    def load(cls, path, rng=None, block=BLOCK):
+        # One value per line (the first column is used)
+        values = np.loadtxt(path, ndmin=2)[:, 0]
+        return cls(values, rng, block)
+
+    def sample(self, shape):
+        return self.values[self.rng.randint(0, len(self.values), shape)]
+
+    def mean(self):
+        return float(self.values.mean())
+
+    def moment2(self):
+        return float(np.mean(self.values**2))
+
+
+def pollaczek_khinchine(lambd, service):
+    # Mean number of customers in an M/G/1 system
+    rho = lambd * service.mean()
+    if rho >= 1:
+        return np.inf
+    return rho + lambd**2 * service.moment2() / (2 * (1 - rho))
+
+
+if __name__ == "__main__":
+    import qsim_np
+    lambd, mu = qsim_np.lambd, qsim_np.mu
+    replications = 200
+    if len(sys.argv) > 1:
+        replications = int(sys.argv[1])
+    simtime = 2000.0
+    rng = np.random.RandomState(1)
+    services = (
+        ("exponential", Exponential(mu, rng)),
+        ("deterministic", Deterministic(1.0 / mu, rng)),
+        ("erlang-4", Erlang(4, mu, rng)),
+        ("hyperexponential", HyperExponential((0.9, 0.1), (1.8 * mu, 0.2 * mu), rng)),
+    )
+    for name, service in services:
+        navg, customers = qsim_np.simulate(Exponential(lambd, rng), service, simtime, replications)
+        mean, ci = qsim_np.summary(navg)
+        print("M/%-16s P-K %f  simulated %f +- %f" %
+              (name, pollaczek_khinchine(lambd, service), mean, ci))
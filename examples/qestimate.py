@@ -0,0 +1,164 @@
+#! /usr/bin/python
+#
+# Sequential estimation of the mean queue length from one long run.
+#
+# Close to rho = 1 a fixed length run (like the 200 seconds of qsim.py) gives a
+# very noisy average and no idea of how long to run. Here a single long run of
+# the vectorized engine (qsim_np.py) is extended a block of customers at a time
+# and one of two estimators gives a confidence interval:
+#
+# - regenerative: the run is split into cycles at every arrival to an empty
+#   system. Cycles are independent, so the ratio of the total area under N(t)
+#   to the total time gives the estimate and the spread of the cycles gives a
+#   valid confidence interval.
+# - batch means: the run is split into a fixed number of batches of equal
+#   numbers of customers, and the batch averages are treated as independent.
+#
+# The run stops as soon as the half width of the 95% confidence interval is
+# below the requested precision (relative to the estimate).
+#
+# usage: qestimate.py [<lambd> [<mu> [<precision> [regenerative|batch]]]]
+
+import os
+import sys
+import time
+import array
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "task3"))
+import stats
+import qdist
+import qsim_np
+
+lambd=19.0    # customers/hour
+mu=20.0       # customers/hour
+precision=0.02
+
+METHODS = ("regenerative", "batch")
+
+# Customers per block of the run
+BLOCK = 16384
+
+# Number of batches for batch means
+BATCHES = 30
+
+# Fewest cycles or blocks before the precision is checked
+MIN_SAMPLES = 30
+
+
+class Run(object):
+    # Cycle and block statistics of one run, added a block at a time
+    def __init__(self):
+        self.cycle_area = array.array("d")
+        self.cycle_length = array.array("d")
+        self.block_area = array.array("d")
+        self.block_length = array.array("d")
+        self.customers = 0
+        self.open_area = 0.0        # area of the cycle in progress
+        self.open_start = None      # start of the cycle in progress
+        self.last_departure = 0.0
+        self.sojourn = 0.0          # total time in the system of all customers
+        self.in_system = np.zeros(0)    # departure times after the last block
+        self.prev_time = 0.0
+        self.prev_area = 0.0
+
+    def add(self, a, d):
+        self.customers += len(a)
+        sojourn = d - a
+        # Regeneration points, arrivals to an empty system
+        starts = np.r_[a[0] >= self.last_departure, a[1:] >= d[:-1]]
+        cycle = np.cumsum(starts)
+        area = np.bincount(cycle, weights=sojourn)
+        start_times = a[starts]
+        if len(start_times):
+            if self.open_start is not None:
+                self.cycle_area.append(self.open_area + area[0])
+                self.cycle_length.append(start_times[0] - self.open_start)
+            self.cycle_area.extend(area[1:-1].tolist())
+            self.cycle_length.extend(np.diff(start_times).tolist())
+            self.open_area = area[-1]
+            self.open_start = start_times[-1]
+        else:
+            self.open_area += area[0]
+        self.last_departure = d[-1]
+        # Area under N(t) up to the last arrival of the block, customers still
+        # in the system only count up to then
+        now = a[-1]
+        self.sojourn += sojourn.sum()
+        pending = np.concatenate((self.in_system, d))
+        self.in_system = pending[pending > now]
+        total = self.sojourn - (self.in_system - now).sum()
+        self.block_area.append(total - self.prev_area)
+        self.block_length.append(now - self.prev_time)
+        self.prev_area = total
+        self.prev_time = now
+
+    def time(self):
+        return self.prev_time
+
+    def regenerative(self):
+        # Ratio estimate and half width of its 95% confidence interval
+        y = np.frombuffer(self.cycle_area)
+        tau = np.frombuffer(self.cycle_length)
+        n = len(y)
+        if n < 2:
+            return np.nan, np.inf, n
+        r = y.sum() / tau.sum()
+        s = np.sqrt(((y - r * tau)**2).sum() / (n - 1))
+        return r, float(stats.t_quantile(n - 1)) * s / (tau.mean() * np.sqrt(n)), n
+
+    def batch_means(self, batches=BATCHES):
+        # One extra batch is made at the start of the run and dropped, it is
+        # biased by starting with an empty system
+        area = np.frombuffer(self.block_area)
+        length = np.frombuffer(self.block_length)
+        if len(area) < batches + 1:
+            return np.nan, np.inf, len(area)
+        split = np.linspace(0, len(area), batches + 2).astype(int)[:-1]
+        area = np.add.reduceat(area, split)[1:]
+        length = np.add.reduceat(length, split)[1:]
+        mean, ci = qsim_np.summary(area / length)
+        return area.sum() / length.sum(), ci, batches
+
+
+def estimate(arrival, service, precision, method="regenerative", block=BLOCK,
+             max_customers=10**9):
+    # Runs until the relative half width of the confidence interval is below
+    # precision. Returns (estimate, half width, samples, Run).
+    run = Run()
+    check = MIN_SAMPLES * block
+    for a, d in qsim_np.blocks(arrival, service, 1, block):
+        run.add(a[0], d[0])
+        if run.customers < check:
+            continue
+        # Check at every doubling of the run, the estimators need all cycles
+        # or blocks anyway
+        check = 2 * run.customers
+        if method == "regenerative":
+            mean, ci, n = run.regenerative()
+        else:
+            mean, ci, n = run.batch_means()
+        if (n >= MIN_SAMPLES and ci <= precision * abs(mean)) or run.customers >= max_customers:
+            return mean, ci, n, run
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) > 0:
+        lambd = float(args[0])
+    if len(args) > 1:
+        mu = float(args[1])
+    if len(args) > 2:
+        precision = float(args[2])
+    method = "regenerative"
+    if len(args) > 3:
+        method = args[3]
+    if method not in METHODS:
+        sys.stderr.write("unknown method %s, use one of %s\n" % (method, ", ".join(METHODS)))
+        sys.exit(1)
+    t = time.time()
+    mean, ci, n, run = estimate(qdist.Exponential(lambd), qdist.Exponential(mu),
+                                precision, method)
+    print("E[N(t)] = %f" % (lambd / (mu - lambd)))
+    print("Average N length %f +- %f (%s, %i samples)" % (mean, ci, method, n))
+    print("%i customers, simulated time %.0f, %.3fs" % (run.customers, run.time(), time.time() - t))
@@ -0,0 +1,167 @@
+#! /usr/bin/python
+#
+# M/M/1 queue of qsim.py on a minimal discrete event core.
+#
+# simpy allocates a full Event object with a callback list for every arrival
+# and departure. Here the event calendar is a heapq of plain (time, sequence
+# number, function) tuples; the sequence number makes events at the same time
+# run in the order they were scheduled. Tuples are compared in C by heapq,
+# which is faster than a __slots__ event class with a Python __lt__. The model
+# is the same arrival/departure model as qsim.py, without printing every event.
+# Inter-arrival and service times come from the block generated distributions
+# of qdist.py, so any G/G/1 queue runs as fast as M/M/1.
+#
+# usage: qsim_heap.py [<simtime>]              run the M/M/1 model once
+#        qsim_heap.py bench [<simtime>]        compare events/s against simpy and
+#                                              random.expovariate
+
+import sys
+import time
+import heapq
+import random
+import qdist
+
+N=0           # initial queue length
+lambd=15.0    # customers/hour
+mu=20.0       # customers/hour
+simtime=200.0 # run for 200 seconds
+
+
+class Simulator(object):
+    def __init__(self, now=0.0):
+        self.now = now
+        self.calendar = []
+        self.seq = 0
+        self.events = 0
+
+    def schedule(self, delay, func):
+        self.seq += 1
+        heapq.heappush(self.calendar, (self.now + delay, self.seq, func))
+
+    def run(self, until):
+        calendar = self.calendar
+        pop = heapq.heappop
+        while calendar and calendar[0][0] <= until:
+            self.now, seq, func = pop(calendar)
+            self.events += 1
+            func()
+        self.now = until
+
+
+class Queue(object):
+    # Arrival/departure model of qsim.py, state kept on the object instead of
+    # in globals. arrival and service return the next inter-arrival and
+    # service time when called (e.g. qdist distributions).
+    def __init__(self, sim, arrival, service, n=0):
+        self.sim = sim
+        self.arrival_time = arrival
+        self.service_time = service
+        self.n = n
+        self.area = 0.0
+        self.prev_t = sim.now
+
+    def update_avg(self):
+        t = self.sim.now
+        self.area += self.n * (t - self.prev_t)
+        self.prev_t = t
+
+    def start(self):
+        self.sim.schedule(self.arrival_time(), self.arrival)
+
+    def arrival(self):
+        self.update_avg()
+        self.n += 1
+        if self.n == 1:
+            self.sim.schedule(self.service_time(), self.departure)
+        self.sim.schedule(self.arrival_time(), self.arrival)
+
+    def departure(self):
+        self.update_avg()
+        self.n -= 1
+        if self.n > 0:
+            self.sim.schedule(self.service_time(), self.departure)
+
+    def navg(self):
+        # Time average number of customers up to now
+        self.update_avg()
+        return self.area / self.sim.now
+
+
+def run_once(simtime, arrival=None, service=None):
+    # M/M/1 unless other inter-arrival and service times are given, either as
+    # the next() of a qdist distribution or any function without arguments
+    if arrival is None:
+        arrival = qdist.Exponential(lambd).next
+    if service is None:
+        service = qdist.Exponential(mu).next
+    sim = Simulator()
+    model = Queue(sim, arrival, service, N)
+    model.start()
+    sim.run(simtime)
+    return model.navg(), sim.events
+
+
+def run_simpy(simtime):
+    # The model of qsim.py on simpy, without the printing, as the benchmark
+    # reference. A Timeout is an Event scheduled after a delay, like
+    # schedule_new_event in qsim.py (newer simpy versions don't allow setting
+    # ev.ok directly).
+    import simpy
+    state = {"n": N, "area": 0.0, "prev_t": 0.0, "events": 0}
+
+    def schedule_new_event(env, cb_func, delay):
+        ev = simpy.events.Timeout(env, delay)
+        ev.callbacks.append(cb_func)
+
+    def update_avg(t):
+        state["area"] += state["n"] * (t - state["prev_t"])
+        state["prev_t"] = t
+
+    def arrival(ev):
+        state["events"] += 1
+        update_avg(ev.env.now)
+        state["n"] += 1
+        if state["n"] == 1:
+            schedule_new_event(ev.env, departure, random.expovariate(mu))
+        schedule_new_event(ev.env, arrival, random.expovariate(lambd))
+
+    def departure(ev):
+        state["events"] += 1
+        update_avg(ev.env.now)
+        state["n"] -= 1
+        if state["n"] > 0:
+            schedule_new_event(ev.env, departure, random.expovariate(mu))
+
+    env = simpy.Environment(0.0)
+    schedule_new_event(env, arrival, random.expovariate(lambd))
+    env.run(until=simtime)
+    update_avg(simtime)
+    return state["area"] / simtime, state["events"]
+
+
+def run_expovariate(simtime):
+    # Heap core with a random.expovariate call per event, as in qsim.py
+    return run_once(simtime, lambda: random.expovariate(lambd),
+                    lambda: random.expovariate(mu))
+
+
+def bench(simtime):
+    for name, func in (("simpy", run_simpy), ("expovariate", run_expovariate),
+                       ("heap", run_once)):
+        t = time.time()
+        navg, events = func(simtime)
+        elapsed = time.time() - t
+        print("%-11s %9i events in %7.3fs  %10.0f events/s  N avg %f" %
+              (name, events, elapsed, events / elapsed, navg))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        bench(float(args[1]) if len(args) > 1 else 100000.0)
+    else:
+        if args:
+            simtime = float(args[0])
+        navg, events = run_once(simtime)
+        print("E[N(t)] = %f" % (lambd / (mu - lambd)))
+        print("Average N length %f (%i events)" % (navg, events))
@@ -0,0 +1,90 @@
+#! /usr/bin/python
+#
+# Vectorized M/M/1 simulation, the NumPy counterpart of qsim.py.
+#
+# Instead of handling one event at a time, whole blocks of inter-arrival and
+# service times are generated for many independent replications at once
+# (one row per replication). Any distribution of qdist.py can be used for the
+# inter-arrival and service times, so G/G/1 runs at the same speed as M/M/1.
+# The departure times follow from the Lindley recursion
+# D[n] = max(A[n], D[n-1]) + S[n], which unrolls to
+#
+#   D[n] = C[n] + max(D[-1], max over k <= n of (A[k] - C[k-1]))
+#
+# with C the cumulative service time of the block, so a block is computed with
+# a cumsum and a maximum.accumulate. The time average number of customers in
+# the system over [0, simtime] is the total time spent in the system by all
+# customers (cut at simtime) divided by simtime.
+#
+# qsim.py is kept as the event by event reference.
+#
+# usage: qsim_np.py [<replications>]
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "task3"))
+import stats
+import qdist
+
+lambd=15.0    # customers/hour
+mu=20.0       # customers/hour
+simtime=200.0 # run for 200 seconds
+replications=1000
+
+# Customers generated per replication and block
+BLOCK = 1024
+
+
+def blocks(arrival, service, replications, block=BLOCK):
+    # Endless generator of (arrival times, departure times) arrays of shape
+    # (replications, block), each block continuing the previous one.
+    # arrival and service are qdist distributions.
+    last_arrival = np.zeros((replications, 1))
+    last_departure = np.zeros((replications, 1))
+    zeros = np.zeros((replications, 1))
+    while True:
+        a = last_arrival + np.cumsum(arrival.sample((replications, block)), axis=1)
+        c = np.cumsum(service.sample((replications, block)), axis=1)
+        c_prev = np.hstack((zeros, c[:, :-1]))
+        start = np.maximum.accumulate(a - c_prev, axis=1)
+        d = c + np.maximum(start, last_departure)
+        yield a, d
+        last_arrival = a[:, -1:]
+        last_departure = d[:, -1:]
+
+
+def simulate(arrival, service, simtime, replications, block=BLOCK):
+    # Returns the time average number of customers in the system of every
+    # replication and the number of customers that arrived before simtime
+    area = np.zeros(replications)
+    customers = 0
+    for a, d in blocks(arrival, service, replications, block):
+        inside = a < simtime
+        area += np.where(inside, np.minimum(d, simtime) - a, 0.0).sum(axis=1)
+        customers += int(inside.sum())
+        if not inside[:, -1].any():
+            break
+    return area / simtime, customers
+
+
+def summary(samples):
+    # Mean and half width of the 95% confidence interval
+    n = len(samples)
+    return samples.mean(), float(stats.t_quantile(n - 1)) * samples.std(ddof=1) / np.sqrt(n)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        replications = int(sys.argv[1])
+    t = time.time()
+    navg, customers = simulate(qdist.Exponential(lambd), qdist.Exponential(mu),
+                               simtime, replications)
+    elapsed = time.time() - t
+    mean, ci = summary(navg)
+    print("E[N(t)] = %f" % (lambd / (mu - lambd)))
+    print("Average N length %f +- %f (%i replications)" % (mean, ci, replications))
+    print("%i events in %.3fs, %.0f events/s" %
+          (2 * customers, elapsed, 2 * customers / elapsed))
@@ -17,6 +17,7 @@
 # - A TCP flow from n1 to n3
 
 import sys
+import os
 import ns.applications
 import ns.core
 import ns.internet
@@ -24,6 +25,11 @@ import ns.network
 import ns.point_to_point
 import ns.flow_monitor
 
+# tcptrace is shared with the task3 scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "task3"))
+import tcptrace
+import packet_sinks
+
 #######################################################################################
 # SEEDING THE RNG
 #
@@ -50,6 +56,9 @@ import ns.flow_monitor
 #ns.core.LogComponentEnable("TcpWestwood", ns.core.LOG_LEVEL_LOGIC)
 #ns.core.LogComponentEnable("TcpTahoe", ns.core.LOG_LEVEL_LOGIC)
 #ns.core.LogComponentEnable("TcpNewReno", ns.core.LOG_LEVEL_LOGIC)
+#
+# The congestion window and RTT of the TCP clients don't need the log any more,
+# they can be recorded straight into a file with e.g. --trace=cwnd.npz (see below).
 
 
 
@@ -72,9 +81,11 @@ cmd = ns.core.CommandLine()
 cmd.latency = 1
 cmd.rate = 500000
 cmd.on_off_rate = 300000
+cmd.trace = ""
 cmd.AddValue ("rate", "P2P data rate in bps")
 cmd.AddValue ("latency", "P2P link Latency in miliseconds")
 cmd.AddValue ("on_off_rate", "OnOffApplication data sending rate")
+cmd.AddValue ("trace", "File for the cwnd and RTT traces, empty to disable")
 cmd.Parse(sys.argv)
 
 
@@ -215,14 +226,12 @@ ns.internet.Ipv4GlobalRoutingHelper.PopulateRoutingTables()
 # An On-Off application alternates between on and off modes. In on mode, packets are
 # generated according to DataRate, PacketSize. In off mode, no packets are transmitted.
 
+# One TCP sink per destination node, shared by all connections to it
+sinks = packet_sinks.Sinks(2.0, 50.0)
+
 def SetupTcpConnection(srcNode, dstNode, dstAddr, startTime, stopTime):
-  # Create a TCP sink at dstNode
-  packet_sink_helper = ns.applications.PacketSinkHelper("ns3::TcpSocketFactory",
-                          ns.network.InetSocketAddress(ns.network.Ipv4Address.GetAny(),
-                                                       8080))
-  sink_apps = packet_sink_helper.Install(dstNode)
-  sink_apps.Start(ns.core.Seconds(2.0))
-  sink_apps.Stop(ns.core.Seconds(50.0))
+  # Create a TCP sink at dstNode, unless it already has one
+  sinks.get(dstNode)
 
   # Create TCP connection from srcNode to dstNode
   on_off_tcp_helper = ns.applications.OnOffHelper("ns3::TcpSocketFactory",
@@ -249,6 +258,20 @@ SetupTcpConnection(nodes.Get(1), nodes.Get(3), if3if5.GetAddress(0),
                    ns.core.Seconds(20.0), ns.core.Seconds(40.0))
 
 
+#######################################################################################
+# CONGESTION WINDOW TRACE
+#
+# Record the congestion window and RTT of both TCP clients. The sockets are created
+# when the clients start, so we connect to them just after their start times. Use
+# plot_log.py to plot the trace file.
+
+trace = None
+if cmd.trace:
+  trace = tcptrace.TcpTrace()
+  trace.connect_at(2.0, nodes.Get(0).GetId())
+  trace.connect_at(20.0, nodes.Get(1).GetId())
+
+
 #######################################################################################
 # CREATE A PCAP PACKET TRACE FILE
 #
@@ -313,6 +336,15 @@ for flow_id, flow_stats in monitor.GetFlowStats():
                                      1024/
                                      1024))
 
+# Payload bytes received by each shared sink, the per-flow numbers are above
+for node_id, port in sorted(sinks.sinks):
+  node = ns.network.NodeList.GetNode(node_id)
+  print ("Sink node %i port %i: %i bytes" % (node_id, port, sinks.total_rx(node, port)))
+
+
+if trace is not None:
+  trace.save(cmd.trace)
+
 
 # This is what we want to do last
 ns.core.Simulator.Destroy()
@@ -62,9 +62,11 @@ for i in range(0,10):
  cmd.rate = 500000
  #cmd.interval = 0.01
  cmd.interval = i / 10
+ cmd.pcap = 0
  cmd.AddValue ("latency", "P2P link Latency in miliseconds")
  cmd.AddValue ("rate", "P2P data rate in bps")
  cmd.AddValue ("interval", "UDP client packet interval")
+ cmd.AddValue ("pcap", "Write pcap trace files (0 or 1)")
  cmd.Parse(sys.argv)
 
 
@@ -159,7 +161,8 @@ for i in range(0,10):
  # running Wireshark on each node. sim-udp-0-0.pcap is the file from node 0 and
  # sim-udp-1-0.pcap is the file from node 1.
 
- pointToPoint.EnablePcapAll("sim-udp")
+ if int(cmd.pcap):
+     pointToPoint.EnablePcapAll("sim-udp")
 
 
  #######################################################################################
@@ -0,0 +1,100 @@
+#!/usr/bin/python
+#
+# Subnet allocation for point-to-point links.
+#
+# Every link gets the next /30 (by default) of a pool such as 10.0.0.0/8,
+# handed out by one Ipv4AddressHelper with NewNetwork(), so no address strings
+# are built. Links are assigned in groups of one kind (e.g. "downloaders"),
+# and as a kind gets consecutive subnets the addresses of its links follow
+# from the index by arithmetic: the first device of link i of a kind has
+# address pool + (first + i) * subnet size + 1 and the second device the next
+# one. A /8 pool holds over four million /30 links.
+
+import ns.internet
+import ns.network
+
+DEFAULT_POOL = "10.0.0.0"
+DEFAULT_POOL_PREFIX = 8
+DEFAULT_SUBNET_PREFIX = 30
+
+
+def ip_int(address):
+    a, b, c, d = [int(x) for x in address.split(".")]
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def ip_str(addr):
+    return "%i.%i.%i.%i" % ((addr >> 24) & 255, (addr >> 16) & 255, (addr >> 8) & 255, addr & 255)
+
+
+def mask_str(prefix):
+    return ip_str((0xffffffff << (32 - prefix)) & 0xffffffff)
+
+
+class SubnetAllocator(object):
+    def __init__(self, pool=DEFAULT_POOL, pool_prefix=DEFAULT_POOL_PREFIX,
+                 subnet_prefix=DEFAULT_SUBNET_PREFIX):
+        # The helper hands out host numbers from 1, a /31 has no room for two
+        # of them
+        if subnet_prefix > 30 or subnet_prefix < pool_prefix:
+            raise ValueError("subnet prefix must be between %i and 30" % pool_prefix)
+        self.pool = ip_int(pool) & ((0xffffffff << (32 - pool_prefix)) & 0xffffffff)
+        self.subnet_size = 1 << (32 - subnet_prefix)
+        self.capacity = 1 << (subnet_prefix - pool_prefix)
+        self.helper = ns.internet.Ipv4AddressHelper()
+        self.helper.SetBase(ns.network.Ipv4Address(ip_str(self.pool)),
+                            ns.network.Ipv4Mask(mask_str(subnet_prefix)))
+        self.used = 0
+        self.kinds = dict()     # kind -> [first subnet, number of links]
+        self.last_kind = None
+
+    def _reserve(self, kind):
+        if self.used >= self.capacity:
+            raise ValueError("address pool %s is full" % ip_str(self.pool))
+        if kind != self.last_kind:
+            if kind in self.kinds:
+                raise ValueError("links of kind %s must be assigned together" % kind)
+            self.kinds[kind] = [self.used, 0]
+            self.last_kind = kind
+        self.kinds[kind][1] += 1
+        self.used += 1
+
+    def assign(self, kind, devices):
+        # Gives the link of a NetDeviceContainer with two devices the next
+        # subnet, returns its Ipv4InterfaceContainer
+        self._reserve(kind)
+        interfaces = self.helper.Assign(devices)
+        self.helper.NewNetwork()
+        return interfaces
+
+    def address_int(self, kind, i, side):
+        # Address of device side (0 or 1) of link i of a kind as an integer
+        first, count = self.kinds[kind]
+        if i < 0 or i >= count:
+            raise IndexError("no link %i of kind %s" % (i, kind))
+        return self.pool + (first + i) * self.subnet_size + 1 + side
+
+    def address(self, kind, i, side):
+        return ns.network.Ipv4Address(self.address_int(kind, i, side))
+
+    def network(self, kind, i):
+        # Network address of link i of a kind, as a string
+        return ip_str(self.address_int(kind, i, 0) - 1)
+
+    def prefixes(self, kind):
+        # Fewest (network, prefix length) blocks covering exactly the subnets
+        # of a kind, e.g. for routes to all links of the kind
+        first, count = self.kinds[kind]
+        start = self.pool + first * self.subnet_size
+        end = start + count * self.subnet_size
+        blocks = list()
+        while start < end:
+            size = start & -start if start else 1 << 32
+            while size > end - start:
+                size >>= 1
+            blocks.append((ip_str(start), 33 - size.bit_length()))
+            start += size
+        return blocks
+
+    def __len__(self):
+        return self.used
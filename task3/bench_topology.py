@@ -0,0 +1,152 @@
+#!/usr/bin/python
+#
+# Setup time of star topologies, the per-link loops sim5.py used to have
+# against the bulk builder of topology.py.
+#
+# The per-link version builds a NodeContainer per link in a dict keyed by
+# strings like "n2n3" and installs devices link by link from that dict, as
+# sim5.py connect_nodes() and install_devices() did. The bulk version is
+# topology.create_star(). The last column is ns-3's PointToPointStarHelper,
+# which installs all links in C++ but can't share its hub with another star.
+# Only the setup is timed, nothing is simulated.
+#
+# The second table times the routing setup of a star with an IP stack and
+# addresses: Ipv4GlobalRoutingHelper.PopulateRoutingTables() against the
+# default routes of routing.route_star(). Not run yet with the bindings the
+# sims use, so the gain routing.py is written for is still unverified.
+#
+# The third table times installing an OnOff application on every leaf, sending
+# to the hub: a helper built and configured per client, as sim4.py and sim5.py
+# used to do, against one traffic.TrafficClass installed on all leaves in one
+# call.
+#
+# usage: bench_topology.py [<leaves> ...]      (default 10 100 1000 10000)
+
+import sys
+import time
+import ns.applications
+import ns.core
+import ns.internet
+import ns.network
+import ns.point_to_point
+import ns.point_to_point_layout
+import addressing
+import routing
+import topology
+import traffic
+
+DEFAULT_LEAVES = (10, 100, 1000, 10000)
+
+
+def p2p_helper():
+    helper = ns.point_to_point.PointToPointHelper()
+    helper.SetDeviceAttribute("DataRate", ns.network.DataRateValue(ns.network.DataRate(500000)))
+    helper.SetChannelAttribute("Delay", ns.core.TimeValue(ns.core.MilliSeconds(1)))
+    return helper
+
+
+def per_link(leaves):
+    nodes = ns.network.NodeContainer()
+    nodes.Create(1 + leaves)
+    links = dict()
+    for i in range(1, nodes.GetN()):
+        s = "n0n" + str(i)
+        links[s] = ns.network.NodeContainer()
+        links[s].Add(nodes.Get(0))
+        links[s].Add(nodes.Get(i))
+    helper = p2p_helper()
+    devices = dict()
+    for k, v in links.items():
+        devices[k.replace("n", "d")] = helper.Install(v)
+    return devices
+
+
+def bulk(leaves):
+    hub = ns.network.NodeContainer()
+    hub.Create(1)
+    return topology.create_star(hub.Get(0), leaves, p2p_helper())
+
+
+def star_helper(leaves):
+    return ns.point_to_point_layout.PointToPointStarHelper(leaves, p2p_helper())
+
+
+def routed_star(leaves):
+    star = bulk(leaves)
+    stack = ns.internet.InternetStackHelper()
+    stack.Install(star.hub)
+    stack.Install(star.leaves)
+    star.assign(addressing.SubnetAllocator(), "leaves")
+    return star
+
+
+def timed(func, leaves):
+    t = time.time()
+    func(leaves)
+    elapsed = time.time() - t
+    ns.core.Simulator.Destroy()
+    return elapsed
+
+
+def timed_routing(mode, leaves):
+    # Only the routing setup is timed, not building the star
+    star = routed_star(leaves)
+    t = time.time()
+    if mode == routing.GLOBAL:
+        routing.populate_global()
+    else:
+        routing.route_star(star)
+    elapsed = time.time() - t
+    ns.core.Simulator.Destroy()
+    return elapsed
+
+
+def per_client_onoff(star):
+    for i in range(len(star)):
+        helper = ns.applications.OnOffHelper("ns3::TcpSocketFactory",
+            traffic.remote(star.address(i, topology.HUB)))
+        helper.SetAttribute("DataRate", ns.network.DataRateValue(ns.network.DataRate(300000)))
+        helper.SetAttribute("PacketSize", ns.core.UintegerValue(traffic.PACKET_SIZE))
+        helper.SetAttribute("OnTime", ns.core.StringValue(traffic.EXPONENTIAL_ON))
+        helper.SetAttribute("OffTime", ns.core.StringValue(traffic.EXPONENTIAL_OFF))
+        apps = helper.Install(star.leaf(i))
+        apps.Start(ns.core.Seconds(2.0))
+        apps.Stop(ns.core.Seconds(40.0))
+
+
+def group_onoff(star):
+    clients = traffic.TrafficClass(300000, traffic.EXPONENTIAL_ON, traffic.EXPONENTIAL_OFF)
+    clients.install(star.leaves, star.address(0, topology.HUB),
+                    ns.core.Seconds(2.0), ns.core.Seconds(40.0))
+
+
+def timed_onoff(func, leaves):
+    # Only the application setup is timed
+    star = routed_star(leaves)
+    t = time.time()
+    func(star)
+    elapsed = time.time() - t
+    ns.core.Simulator.Destroy()
+    return elapsed
+
+
+if __name__ == "__main__":
+    counts = [int(x) for x in sys.argv[1:]] or DEFAULT_LEAVES
+    print("%8s %12s %12s %8s %12s" % ("leaves", "per link", "bulk", "speedup", "star helper"))
+    for n in counts:
+        a = timed(per_link, n)
+        b = timed(bulk, n)
+        c = timed(star_helper, n)
+        print("%8i %11.3fs %11.3fs %7.1fx %11.3fs" % (n, a, b, a / b, c))
+    print("")
+    print("%8s %12s %12s %8s" % ("leaves", "global", "static", "speedup"))
+    for n in counts:
+        a = timed_routing(routing.GLOBAL, n)
+        b = timed_routing(routing.STATIC, n)
+        print("%8i %11.3fs %11.3fs %7.1fx" % (n, a, b, a / b))
+    print("")
+    print("%8s %12s %12s %8s" % ("clients", "per client", "group", "speedup"))
+    for n in counts:
+        a = timed_onoff(per_client_onoff, n)
+        b = timed_onoff(group_onoff, n)
+        print("%8i %11.3fs %11.3fs %7.1fx" % (n, a, b, a / b))
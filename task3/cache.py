@@ -0,0 +1,139 @@
+#!/usr/bin/python
+#
+# Persistent result cache for simulation runs.
+#
+# Results are stored as one JSON file per scenario in the cache directory. The
+# file name is the hash of the full scenario description, so a run is only
+# simulated again if something that affects it has changed. When the cache
+# grows past its size limit the least recently used results are removed.
+#
+# The size of the cache is kept as a running total, so the directory is only
+# listed when the total goes over the limit, not after every put. Eviction
+# then goes down to EVICT_TO of the limit, so the next scan is many puts
+# away. Results written by other processes are only counted from the next
+# scan on.
+#
+# usage: cache.py clear [<cache directory>]
+#        cache.py info [<cache directory>]
+
+import sys
+import os
+import json
+import hashlib
+
+DEFAULT_DIR = "cache"
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# Fraction of the size limit eviction goes down to
+EVICT_TO = 0.9
+
+
+def scenario_hash(scenario):
+    s = json.dumps(scenario, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.total = sum(size for mtime, size, path in self.entries())
+
+    def path(self, scenario):
+        return os.path.join(self.directory, scenario_hash(scenario) + ".json")
+
+    def get(self, scenario):
+        path = self.path(scenario)
+        try:
+            f = open(path)
+        except IOError:
+            return None
+        try:
+            entry = json.load(f)
+        except ValueError:
+            return None
+        finally:
+            f.close()
+        # Touch the file, the modification time is what eviction looks at
+        os.utime(path, None)
+        return entry["result"]
+
+    def put(self, scenario, result):
+        path = self.path(scenario)
+        tmp = path + ".%i.tmp" % os.getpid()
+        f = open(tmp, "w")
+        json.dump({"scenario": scenario, "result": result}, f, sort_keys=True)
+        f.close()
+        self.total += os.path.getsize(tmp) - self._size(path)
+        os.rename(tmp, path)
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def _size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def invalidate(self, scenario):
+        path = self.path(scenario)
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        self.total -= size
+
+    def entries(self):
+        # (modification time, size, path) of every cached result, oldest first
+        entries = list()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+        if total > self.max_bytes:
+            for mtime, size, path in entries:
+                if total <= EVICT_TO * self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+        self.total = total
+
+    def clear(self):
+        for mtime, size, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.total = 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] not in ("clear", "info"):
+        sys.stderr.write("usage: %s clear|info [<cache directory>]\n" % sys.argv[0])
+        sys.exit(1)
+    directory = DEFAULT_DIR
+    if len(sys.argv) == 3:
+        directory = sys.argv[2]
+    cache = ResultCache(directory)
+    if sys.argv[1] == "clear":
+        cache.clear()
+    else:
+        entries = cache.entries()
+        print("%i results, %i bytes" % (len(entries), sum(e[1] for e in entries)))
@@ -0,0 +1,64 @@
+#!/usr/bin/python
+#
+# Opt-in pcap capture for simulation runs.
+#
+# Capture is off unless a script asks for it. When on, packets can be cut to a
+# snap length (e.g. 96 bytes keeps the PPP, IP and TCP headers only) and the
+# capture directory can be kept below a size limit by removing the oldest
+# capture files (plain or archived by pcap_archive.py) after each run.
+
+import os
+import ns.core
+import ns.point_to_point
+
+DEFAULT_DIR = "pcap"
+
+# Enough for PPP + IPv4 + TCP headers with options
+HEADERS_SNAPLEN = 96
+
+
+def configure(snaplen):
+    # snaplen 0 captures whole packets
+    if snaplen > 0:
+        ns.core.Config.SetDefault("ns3::PcapFileWrapper::CaptureSize",
+                                  ns.core.UintegerValue(snaplen))
+
+
+def enable(prefix, devices, promiscuous=True):
+    # Captures on the given net devices only, one file per device
+    directory = os.path.dirname(prefix)
+    if directory and not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            pass
+    helper = ns.point_to_point.PointToPointHelper()
+    for device in devices:
+        helper.EnablePcap(prefix, device, promiscuous)
+
+
+def rotate(directory, max_bytes):
+    # Removes the oldest capture files until the directory holds at most
+    # max_bytes of them
+    if max_bytes <= 0 or not os.path.isdir(directory):
+        return
+    files = list()
+    for name in os.listdir(directory):
+        if not name.endswith(".pcap") and not name.endswith(".pcapz"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    files.sort()
+    total = sum(f[1] for f in files)
+    for mtime, size, path in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
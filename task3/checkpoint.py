@@ -0,0 +1,64 @@
+#!/usr/bin/python
+#
+# Checkpoint journal for long sweeps.
+#
+# Every finished run is appended to the journal as one JSON line and synced to
+# disk before the sweep moves on. A restarted sweep loads the journal and skips
+# the runs already in it. Appends are done under an exclusive file lock, so
+# several processes can share one journal. A line cut short by a crash is
+# ignored when loading.
+
+import os
+import json
+import fcntl
+
+
+class Checkpoint(object):
+    def __init__(self, path):
+        self.path = path
+        self.results = dict()
+        self.fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            self._load()
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _load(self):
+        f = open(self.path)
+        data = f.read()
+        f.close()
+        for line in data.split("\n"):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self.results[entry["key"]] = entry["result"]
+        # Terminate a partly written last line so the next entry isn't glued
+        # onto it
+        if data and not data.endswith("\n"):
+            os.write(self.fd, b"\n")
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def record(self, key, result):
+        line = json.dumps({"key": key, "result": result}, sort_keys=True) + "\n"
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            os.write(self.fd, line.encode("utf-8"))
+            os.fsync(self.fd)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.results[key] = result
+
+    def close(self):
+        os.close(self.fd)
+
+    def remove(self):
+        # Called once the sweep is complete
+        self.close()
+        os.remove(self.path)
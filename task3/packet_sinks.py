@@ -0,0 +1,47 @@
+#!/usr/bin/python
+#
+# One PacketSink per (node, port), shared by all flows to it.
+#
+# A PacketSink listening on a TCP port accepts any number of connections, so
+# installing one sink application per connection only adds application
+# objects (all bound to the same port) to the destination node, e.g. a
+# thousand on the server of sim5 with a thousand uploaders. Sinks.get()
+# installs the sink the first time a (node, port) is asked for and returns
+# the same one after that.
+#
+# A shared sink only counts the bytes of all its flows together, the bytes of
+# every flow come from FlowMonitor.
+
+import ns.applications
+import ns.core
+import ns.network
+
+DEFAULT_PORT = 8080
+TCP_SOCKET_FACTORY = "ns3::TcpSocketFactory"
+
+
+class Sinks(object):
+    def __init__(self, start_time, stop_time, protocol=TCP_SOCKET_FACTORY):
+        # start_time and stop_time in seconds
+        self.start_time = start_time
+        self.stop_time = stop_time
+        self.protocol = protocol
+        self.sinks = dict()     # (node id, port) -> PacketSink
+
+    def get(self, node, port=DEFAULT_PORT):
+        key = (node.GetId(), port)
+        if key not in self.sinks:
+            helper = ns.applications.PacketSinkHelper(self.protocol,
+                ns.network.InetSocketAddress(ns.network.Ipv4Address.GetAny(), port))
+            apps = helper.Install(node)
+            apps.Start(ns.core.Seconds(self.start_time))
+            apps.Stop(ns.core.Seconds(self.stop_time))
+            self.sinks[key] = apps.Get(0)
+        return self.sinks[key]
+
+    def __len__(self):
+        return len(self.sinks)
+
+    def total_rx(self, node, port=DEFAULT_PORT):
+        # Bytes received by the sink of all its flows
+        return self.sinks[(node.GetId(), port)].GetTotalRx()
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+#
+# Compressed, time indexed archive for pcap files.
+#
+# The records of a capture are packed into blocks of about block_bytes, each
+# compressed on its own with zlib. An index at the end of the archive holds the
+# position and the first and last timestamp of every block, so a time window
+# can be read by decompressing only the blocks that overlap it.
+#
+# Layout: magic, pcap global header, compressed blocks, index, footer.
+#
+# usage: pcap_archive.py archive <pcap file> [<pcap file> ...]  (replaces the pcap files)
+#        pcap_archive.py extract <archive> <start time> <end time> <pcap file>
+#        pcap_archive.py check <archive> <pcap file> <start time> <end time> <bin width>
+
+import sys
+import os
+import struct
+import zlib
+import numpy as np
+import pcapstat
+
+MAGIC = b"PCAPZ\x01\x00\x00"
+FOOTER_MAGIC = b"PCAPZIDX"
+FOOTER = struct.Struct("<QQ8s")     # index offset, number of blocks, magic
+GLOBAL_HEADER_SIZE = 24
+RECORD_HEADER_SIZE = 16
+EXTENSION = ".pcapz"
+
+DEFAULT_BLOCK_BYTES = 1024 * 1024
+
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u8"), ("records", "<u8"),
+                        ("first", "<f8"), ("last", "<f8")])
+
+
+def archive(pcap_path, archive_path, block_bytes=DEFAULT_BLOCK_BYTES, level=6):
+    capture = pcapstat.Capture(pcap_path)
+    try:
+        out = open(archive_path + ".tmp", "wb")
+        out.write(MAGIC)
+        out.write(capture.mm[:GLOBAL_HEADER_SIZE])
+        ends = capture.offsets + RECORD_HEADER_SIZE + capture.incl_len
+        # Block number of every record, records are never split over blocks
+        block = (capture.offsets - GLOBAL_HEADER_SIZE) // block_bytes
+        starts = np.nonzero(np.r_[True, block[1:] != block[:-1]])[0] if len(block) else []
+        index = np.zeros(len(starts), dtype=INDEX_DTYPE)
+        bounds = list(starts) + [len(block)]
+        for i in range(len(starts)):
+            first, last = bounds[i], bounds[i + 1]
+            raw = capture.mm[int(capture.offsets[first]):int(ends[last - 1])]
+            compressed = zlib.compress(raw, level)
+            index[i] = (out.tell(), len(compressed), last - first,
+                        capture.time[first:last].min(), capture.time[first:last].max())
+            out.write(compressed)
+        index_offset = out.tell()
+        out.write(index.tobytes())
+        out.write(FOOTER.pack(index_offset, len(index), FOOTER_MAGIC))
+        out.close()
+        os.rename(archive_path + ".tmp", archive_path)
+    finally:
+        capture.close()
+
+
+class Archive(object):
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a pcap archive" % path)
+        self.global_header = self.file.read(GLOBAL_HEADER_SIZE)
+        self.file.seek(-FOOTER.size, os.SEEK_END)
+        index_offset, blocks, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != FOOTER_MAGIC:
+            raise ValueError("%s has no index, the archive is incomplete" % path)
+        self.file.seek(index_offset)
+        self.index = np.frombuffer(self.file.read(blocks * INDEX_DTYPE.itemsize),
+                                   dtype=INDEX_DTYPE)
+
+    def close(self):
+        self.file.close()
+
+    def blocks(self, start, end):
+        # Numbers of the blocks holding records between start and end
+        return np.nonzero((self.index["last"] >= start) & (self.index["first"] <= end))[0]
+
+    def read(self, start, end):
+        # Returns the records of all blocks overlapping the window as a pcap
+        # file image, records just outside the window may be included
+        parts = [self.global_header]
+        for b in self.blocks(start, end):
+            self.file.seek(int(self.index["offset"][b]))
+            parts.append(zlib.decompress(self.file.read(int(self.index["length"][b]))))
+        return b"".join(parts)
+
+    def capture(self):
+        # pcapstat.Capture of the whole archive, decompressed into memory
+        return pcapstat.Capture(self.path, self.read(float("-inf"), float("inf")))
+
+    def window(self, start, end):
+        # pcapstat.Capture of the blocks overlapping the window. Use
+        # bins(width, start, end) on it to look at the window only.
+        return pcapstat.Capture(self.path, self.read(start, end))
+
+    def extract(self, start, end, pcap_path):
+        # Writes the records between start and end to a plain pcap file
+        buf = self.read(start, end)
+        capture = pcapstat.Capture(self.path, buf)
+        keep = (capture.time >= start) & (capture.time <= end)
+        out = open(pcap_path, "wb")
+        out.write(buf[:GLOBAL_HEADER_SIZE])
+        for offset, length in zip(capture.offsets[keep], capture.incl_len[keep]):
+            out.write(buf[offset:offset + RECORD_HEADER_SIZE + length])
+        out.close()
+        capture.close()
+
+
+def open_capture(path):
+    # pcapstat.Capture of a pcap file or of an archive
+    if path.endswith(EXTENSION):
+        a = Archive(path)
+        try:
+            return a.capture()
+        finally:
+            a.close()
+    return pcapstat.Capture(path)
+
+
+def check_window(archive_path, pcap_path, start, end, width):
+    # Bytes and packets per bin of a window read from the archive and read
+    # directly from the original capture. Returns (archive packets, capture
+    # packets, equal).
+    a = Archive(archive_path)
+    window = a.window(start, end)
+    capture = pcapstat.Capture(pcap_path)
+    try:
+        edges, flows, a_bytes, a_packets = window.bins(width, start, end, by_flow=False)
+        edges, flows, c_bytes, c_packets = capture.bins(width, start, end, by_flow=False)
+        equal = np.array_equal(a_packets, c_packets) and np.array_equal(a_bytes, c_bytes)
+        return a_packets[0], c_packets[0], equal
+    finally:
+        window.close()
+        capture.close()
+        a.close()
+
+
+def archive_and_remove(pcap_path, block_bytes=DEFAULT_BLOCK_BYTES):
+    # Replaces a pcap file with its archive
+    archive_path = os.path.splitext(pcap_path)[0] + EXTENSION
+    archive(pcap_path, archive_path, block_bytes)
+    os.remove(pcap_path)
+    return archive_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "archive":
+        for path in sys.argv[2:]:
+            print(archive_and_remove(path))
+    elif len(sys.argv) == 6 and sys.argv[1] == "extract":
+        a = Archive(sys.argv[2])
+        a.extract(float(sys.argv[3]), float(sys.argv[4]), sys.argv[5])
+        a.close()
+    elif len(sys.argv) == 7 and sys.argv[1] == "check":
+        a_packets, c_packets, equal = check_window(sys.argv[2], sys.argv[3], float(sys.argv[4]),
+                                                   float(sys.argv[5]), float(sys.argv[6]))
+        print("archive packets per bin: %s" % a_packets)
+        print("capture packets per bin: %s" % c_packets)
+        print("OK" if equal else "MISMATCH")
+        sys.exit(0 if equal else 1)
+    else:
+        sys.stderr.write("usage: %s archive <pcap file> [<pcap file> ...]\n"
+                         "       %s extract <archive> <start time> <end time> <pcap file>\n"
+                         "       %s check <archive> <pcap file> <start time> <end time> <bin width>\n"
+                         % (sys.argv[0], sys.argv[0], sys.argv[0]))
+        sys.exit(1)
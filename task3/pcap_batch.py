@@ -0,0 +1,120 @@
+#!/usr/bin/python
+#
+# Batch analysis of a directory of pcap files and pcap archives (.pcapz, see
+# pcap_archive.py).
+#
+# Every capture in the directory is summarised (throughput series,
+# retransmissions, packet inter-arrival times) on a process pool and the
+# summaries are written to one table in the results directory. Summaries are
+# kept in the result cache keyed on the path, size and modification time of the
+# capture, so running this again only reads captures that are new or changed.
+#
+# usage: pcap_batch.py <bin width in seconds> [<pcap directory>]
+
+import sys
+import os
+import numpy as np
+import sweep
+import cache
+import results
+import pcapstat
+import pcap_archive
+
+# Bump this when summarise() changes
+SUMMARY_VERSION = 1
+
+
+def summarise(path, width):
+    c = pcap_archive.open_capture(path)
+    try:
+        n = len(c)
+        edges, flows, nbytes, npackets = c.bins(width, by_flow=False)
+        p = c.packets()
+        flows, flow = c.flows()
+        # A TCP segment carrying data whose sequence number was already seen
+        # in the same flow is a retransmission
+        data = (p["proto"] == pcapstat.PROTO_TCP) & (p["payload"] > 0) & (flow >= 0)
+        segments = (flow[data].astype(np.uint64) << np.uint64(32)) | p["seq"][data]
+        retransmissions = len(segments) - len(np.unique(segments))
+        iat = np.diff(c.time)
+        return {
+            "packets": n,
+            "bytes": int(c.orig_len.sum()),
+            "flows": len(flows),
+            "start": float(c.time[0]) if n else 0.0,
+            "duration": float(c.time[-1] - c.time[0]) if n else 0.0,
+            "retransmissions": int(retransmissions),
+            "iat_mean": float(iat.mean()) if len(iat) else 0.0,
+            "iat_sd": float(iat.std()) if len(iat) else 0.0,
+            "iat_max": float(iat.max()) if len(iat) else 0.0,
+            "throughput": list(nbytes[0] * 8.0 / width),     # bit/s per bin
+        }
+    finally:
+        c.close()
+
+
+def summary_key(path, width):
+    st = os.stat(path)
+    return {
+        "summary": "pcap",
+        "version": SUMMARY_VERSION,
+        "path": os.path.abspath(path),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "width": width,
+    }
+
+
+def analyse(directory, width, workers=0, result_cache=None):
+    # Returns the list of capture paths and their summaries
+    names = set(os.listdir(directory))
+    # A pcap that is being archived is only read from its archive
+    paths = sorted(os.path.join(directory, name) for name in names
+                   if name.endswith(pcap_archive.EXTENSION) or
+                   (name.endswith(".pcap") and name[:-len(".pcap")] + pcap_archive.EXTENSION not in names))
+    summaries = dict()
+    jobs = list()
+    for path in paths:
+        if result_cache is not None:
+            summaries[path] = result_cache.get(summary_key(path, width))
+        if summaries.get(path) is None:
+            jobs.append((path, width))
+    print("%i captures to read, %i cached" % (len(jobs), len(paths) - len(jobs)))
+    for job, summary, elapsed in sweep.run_jobs(summarise, jobs, workers):
+        summaries[job[0]] = summary
+        if result_cache is not None:
+            result_cache.put(summary_key(job[0], width), summary)
+        print("%s  %i packets  %.2fs" % (job[0], summary["packets"], elapsed))
+    return paths, [summaries[path] for path in paths]
+
+
+def save(path, paths, summaries):
+    # One row per capture, the throughput series of all captures are stored
+    # back to back with series_start giving the first bin of each capture
+    columns = dict()
+    columns["capture"] = np.array([os.path.basename(p) for p in paths])
+    for name, dtype in (("packets", "i8"), ("bytes", "i8"), ("flows", "i4"),
+                        ("start", "f8"), ("duration", "f8"), ("retransmissions", "i8"),
+                        ("iat_mean", "f8"), ("iat_sd", "f8"), ("iat_max", "f8")):
+        columns[name] = np.array([s[name] for s in summaries], dtype=dtype)
+    lengths = [len(s["throughput"]) for s in summaries]
+    columns["series_start"] = np.cumsum([0] + lengths)[:-1].astype("i8")
+    columns["series"] = np.array([x for s in summaries for x in s["throughput"]], dtype="f8")
+    np.savez_compressed(path, **columns)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.stderr.write("usage: %s <bin width in seconds> [<pcap directory>]\n" % sys.argv[0])
+        sys.exit(1)
+    width = float(sys.argv[1])
+    directory = "pcap"
+    if len(sys.argv) == 3:
+        directory = sys.argv[2]
+    paths, summaries = analyse(directory, width, 0, cache.ResultCache())
+    path = results.new_path("pcap")
+    save(path, paths, summaries)
+    for p, s in zip(paths, summaries):
+        print("%s  %i packets  %i retransmissions  mean inter-arrival %f s" %
+              (os.path.basename(p), s["packets"], s["retransmissions"], s["iat_mean"]))
+    print("Results written to " + path)
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+#
+# Memory-mapped pcap reader and throughput binning.
+#
+# The capture file is memory mapped and only the offsets of the records are
+# found by walking the file. Record headers and packet headers are then decoded
+# in bulk with NumPy structured dtypes, a chunk of records at a time, so even
+# multi-GB captures never turn into per-packet Python objects. Works on the
+# files written by EnablePcap (PPP link type) as well as Ethernet and raw IP
+# captures.
+#
+# usage: pcapstat.py <bin width in seconds> <pcap file> [<pcap file> ...]
+#        (pcap archives, .pcapz, are read as well)
+
+import sys
+import mmap
+import struct
+import array
+import numpy as np
+import matplotlib.pyplot as plt
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_PPP = 9
+LINKTYPE_RAW = 101
+
+# Offset of the IP header in a packet for each supported link type
+L3_OFFSET = {LINKTYPE_ETHERNET: 14, LINKTYPE_PPP: 2, LINKTYPE_RAW: 0}
+
+# Records decoded per chunk
+CHUNK = 1 << 20
+
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+FLOW_DTYPE = np.dtype([("src", "u4"), ("dst", "u4"), ("proto", "u1"),
+                       ("sport", "u2"), ("dport", "u2")])
+
+IP_DTYPE = np.dtype([("ver_ihl", "u1"), ("tos", "u1"), ("total_len", ">u2"),
+                     ("id", ">u2"), ("frag", ">u2"), ("ttl", "u1"), ("proto", "u1"),
+                     ("checksum", ">u2"), ("src", ">u4"), ("dst", ">u4")])
+
+L4_DTYPE = np.dtype([("sport", ">u2"), ("dport", ">u2"), ("seq", ">u4"),
+                     ("ack", ">u4"), ("offset", "u1"), ("flags", "u1"),
+                     ("window", ">u2")])
+
+
+def _gather(data, offsets, dtype):
+    # Reads one dtype sized struct at every offset
+    size = dtype.itemsize
+    idx = offsets[:, None] + np.arange(size)
+    np.minimum(idx, len(data) - 1, out=idx)
+    return data[idx].view(dtype)[:, 0]
+
+
+def ip_str(addr):
+    return "%i.%i.%i.%i" % ((addr >> 24) & 255, (addr >> 16) & 255, (addr >> 8) & 255, addr & 255)
+
+
+class Capture(object):
+    def __init__(self, path, buf=None):
+        # buf may hold the capture in memory instead of reading the file,
+        # path is then only used in messages
+        self.path = path
+        self.file = None
+        if buf is None:
+            self.file = open(path, "rb")
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.mm = buf
+        self.data = np.frombuffer(self.mm, dtype=np.uint8)
+        self._read_global_header()
+        self.offsets = self._record_offsets()
+        self._read_record_headers()
+        self._packets = None
+
+    def close(self):
+        self.data = None
+        if self.file is not None:
+            self.mm.close()
+            self.file.close()
+
+    def _read_global_header(self):
+        magic = self.mm[:4]
+        formats = {
+            b"\xd4\xc3\xb2\xa1": ("<", 1e-6), b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+            b"\x4d\x3c\xb2\xa1": ("<", 1e-9), b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+        }
+        if magic not in formats:
+            raise ValueError("%s is not a pcap file" % self.path)
+        self.endian, self.resolution = formats[magic]
+        fields = struct.unpack_from(self.endian + "HHiIII", self.mm, 4)
+        self.snaplen = fields[4]
+        self.linktype = fields[5]
+
+    def _record_offsets(self):
+        # The only per-record Python loop, records have to be walked one by
+        # one because their offsets depend on all earlier lengths. Offsets are
+        # kept as doubles, python 2 arrays have no 64 bit integer type.
+        offsets = array.array("d")
+        unpack_from = struct.Struct(self.endian + "I").unpack_from
+        mm = self.mm
+        end = len(mm) - 16
+        off = 24
+        while off <= end:
+            offsets.append(off)
+            off += 16 + unpack_from(mm, off + 8)[0]
+        if off > len(mm):
+            # Last record was cut short, e.g. by a crash during capture
+            offsets.pop()
+        if not offsets:
+            return np.zeros(0, dtype=np.int64)
+        return np.frombuffer(offsets, dtype=np.float64).astype(np.int64)
+
+    def _read_record_headers(self):
+        dtype = np.dtype([("ts_sec", self.endian + "u4"), ("ts_frac", self.endian + "u4"),
+                          ("incl_len", self.endian + "u4"), ("orig_len", self.endian + "u4")])
+        n = len(self.offsets)
+        self.time = np.empty(n)
+        self.incl_len = np.empty(n, dtype=np.int64)
+        self.orig_len = np.empty(n, dtype=np.int64)
+        for i in range(0, n, CHUNK):
+            h = _gather(self.data, self.offsets[i:i + CHUNK], dtype)
+            self.time[i:i + CHUNK] = h["ts_sec"] + h["ts_frac"] * self.resolution
+            self.incl_len[i:i + CHUNK] = h["incl_len"]
+            self.orig_len[i:i + CHUNK] = h["orig_len"]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def packets(self):
+        # IPv4/TCP/UDP header fields of every record as a dict of arrays.
+        # Records that aren't IPv4 or don't have the headers captured are
+        # marked invalid.
+        if self._packets is not None:
+            return self._packets
+        if self.linktype not in L3_OFFSET:
+            raise ValueError("unsupported link type %i in %s" % (self.linktype, self.path))
+        n = len(self)
+        p = {
+            "valid": np.zeros(n, dtype=bool),
+            "src": np.zeros(n, dtype=np.uint32),
+            "dst": np.zeros(n, dtype=np.uint32),
+            "proto": np.zeros(n, dtype=np.uint8),
+            "sport": np.zeros(n, dtype=np.uint16),
+            "dport": np.zeros(n, dtype=np.uint16),
+            "seq": np.zeros(n, dtype=np.uint32),
+            "flags": np.zeros(n, dtype=np.uint8),
+            "payload": np.zeros(n, dtype=np.int64),
+        }
+        l3 = L3_OFFSET[self.linktype]
+        for i in range(0, n, CHUNK):
+            s = slice(i, i + CHUNK)
+            start = self.offsets[s] + 16 + l3
+            incl = self.incl_len[s] - l3
+            ip = _gather(self.data, start, IP_DTYPE)
+            ihl = (ip["ver_ihl"] & 15).astype(np.int64) * 4
+            valid = (incl >= IP_DTYPE.itemsize) & (ip["ver_ihl"] >> 4 == 4) & (ihl >= 20)
+            l4 = _gather(self.data, start + ihl, L4_DTYPE)
+            tcp = valid & (ip["proto"] == PROTO_TCP) & (incl >= ihl + L4_DTYPE.itemsize)
+            udp = valid & (ip["proto"] == PROTO_UDP) & (incl >= ihl + 8)
+            ports = tcp | udp
+            p["valid"][s] = valid
+            p["src"][s] = np.where(valid, ip["src"], 0)
+            p["dst"][s] = np.where(valid, ip["dst"], 0)
+            p["proto"][s] = np.where(valid, ip["proto"], 0)
+            p["sport"][s] = np.where(ports, l4["sport"], 0)
+            p["dport"][s] = np.where(ports, l4["dport"], 0)
+            p["seq"][s] = np.where(tcp, l4["seq"], 0)
+            p["flags"][s] = np.where(tcp, l4["flags"], 0)
+            tcp_payload = ip["total_len"].astype(np.int64) - ihl - (l4["offset"] >> 4).astype(np.int64) * 4
+            udp_payload = ip["total_len"].astype(np.int64) - ihl - 8
+            p["payload"][s] = np.where(tcp, tcp_payload, np.where(udp, udp_payload, 0))
+        self._packets = p
+        return p
+
+    def flows(self):
+        # Returns the distinct flows as a FLOW_DTYPE array and the index of
+        # the flow of every record, -1 for records that aren't IPv4
+        p = self.packets()
+        valid = np.nonzero(p["valid"])[0]
+        # Pack the five tuple into two integers and sort on them, a lot faster
+        # than np.unique on a structured array
+        hi = (p["src"][valid].astype(np.uint64) << np.uint64(32)) | p["dst"][valid]
+        lo = ((p["proto"][valid].astype(np.uint64) << np.uint64(32)) |
+              (p["sport"][valid].astype(np.uint64) << np.uint64(16)) | p["dport"][valid])
+        order = np.lexsort((lo, hi))
+        hi, lo = hi[order], lo[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+        flow = np.full(len(self), -1, dtype=np.int64)
+        flow[valid[order]] = np.cumsum(first) - 1
+        starts = valid[order[first]]
+        flows = np.zeros(len(starts), dtype=FLOW_DTYPE)
+        for name in FLOW_DTYPE.names:
+            flows[name] = p[name][starts]
+        return flows, flow
+
+    def bins(self, width, start=None, end=None, by_flow=True):
+        # Bytes and packets per bin of width seconds. With by_flow the counts
+        # are (flows, bins) arrays, otherwise (1, bins) for all records.
+        # Returns (bin edges, flows, bytes, packets).
+        if start is None:
+            start = self.time.min() if len(self) else 0.0
+        if end is None:
+            end = self.time.max() if len(self) else 0.0
+        nbins = max(1, int(np.ceil((end - start) / width)))
+        edges = start + width * np.arange(nbins + 1)
+        b = np.floor((self.time - start) / width).astype(np.int64)
+        inside = (self.time >= start) & (self.time <= end)
+        b[inside & (b == nbins)] = nbins - 1    # a record exactly at end
+        keep = inside & (b >= 0) & (b < nbins)
+        if by_flow:
+            flows, flow = self.flows()
+            keep &= flow >= 0
+        else:
+            flows = np.zeros(1, dtype=FLOW_DTYPE)
+            flow = np.zeros(len(self), dtype=np.int64)
+        cell = flow[keep] * nbins + b[keep]
+        size = len(flows) * nbins
+        nbytes = np.bincount(cell, weights=self.orig_len[keep], minlength=size)
+        npackets = np.bincount(cell, minlength=size)
+        return (edges, flows, nbytes.reshape(len(flows), nbins),
+                npackets.reshape(len(flows), nbins))
+
+
+def flow_label(flow):
+    return "%s:%i -> %s:%i" % (ip_str(flow["src"]), flow["sport"],
+                               ip_str(flow["dst"]), flow["dport"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.stderr.write("usage: %s <bin width in seconds> <pcap or pcapz file> [...]\n"
+                         % sys.argv[0])
+        sys.exit(1)
+    import pcap_archive     # imports this module, so not at the top
+    width = float(sys.argv[1])
+    for path in sys.argv[2:]:
+        capture = pcap_archive.open_capture(path)
+        edges, flows, nbytes, npackets = capture.bins(width)
+        for flow, row in zip(flows, nbytes):
+            plt.plot(edges[:-1], row * 8.0 / width, linewidth=0.5,
+                     label=path + " " + flow_label(flow))
+        capture.close()
+    plt.xlabel("time (s)")
+    plt.ylabel("throughput (bit/s)")
+    plt.ylim(0)
+    plt.legend(fontsize="small")
+    plt.show()
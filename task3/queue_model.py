@@ -0,0 +1,143 @@
+#!/usr/bin/python
+#
+# Finite buffer queueing model of the sim5 bottleneck.
+#
+# The uploaders of sim5 all send through the device of node 2 on the link to
+# node 1, whose DropTailQueue holds queue_length packets. That device is
+# modelled as a single server queue with room for K = queue_length + 1 packets
+# (the queue plus the packet being sent), Poisson arrivals at the offered load
+# of the OnOff applications and either exponential (M/M/1/K) or fixed (M/D/1/K)
+# transmission times. The loss probability and delay come out in closed form,
+# so sweep ranges can be screened in milliseconds and only the region where
+# loss takes off needs full ns-3 runs.
+#
+# TCP backs off when packets are lost, so the offered load is an upper bound
+# and the predicted loss is the loss the queue would see without congestion
+# control. It is meant to find where loss starts, not to replace the runs.
+#
+# usage: queue_model.py [<queue length> [<rate> [<on off rate> [<max uploaders> [<step>]]]]]
+
+import sys
+import math
+import numpy as np
+
+# Mean on and off times of the sim5 OnOff applications in seconds
+ON_MEAN = 2.0
+OFF_MEAN = 1.0
+
+# Bytes on the wire per TCP segment: IP and TCP headers and the PPP header
+HEADER_BYTES = 20 + 20 + 2
+TCP_SEGMENT_SIZE = 1448
+
+MODELS = ("mm1k", "md1k")
+
+
+def packet_bits(segment_size=TCP_SEGMENT_SIZE):
+    return 8 * (segment_size + HEADER_BYTES)
+
+
+def offered_load(uploaders, on_off_rate, rate, on=ON_MEAN, off=OFF_MEAN):
+    # Utilisation the uploaders would put on a link of rate bit/s
+    return np.asarray(uploaders, dtype=float) * on_off_rate * on / (on + off) / rate
+
+
+def mm1k(rho, k):
+    # Returns (blocking probability, mean number in the system) of an M/M/1/K
+    # queue, rho may be an array
+    rho = np.asarray(rho, dtype=float)[..., None]
+    n = np.arange(k + 1)
+    # p[n] is proportional to rho^n, scaled by rho^-K when rho > 1 so that
+    # no power overflows
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        p = np.where(rho > 1, (1 / rho) ** (k - n), rho ** n)
+        p = p / p.sum(axis=-1)[..., None]
+    return p[..., k], (p * n).sum(axis=-1)
+
+
+def md1k_one(rho, k):
+    # M/D/1/K from the Markov chain embedded at departures. With pi the
+    # distribution left behind by departures (0 to K-1 customers), the time
+    # average distribution is pi[j] / (pi[0] + rho) for j < K and the
+    # blocking probability is 1 - 1 / (pi[0] + rho).
+    if rho <= 0:
+        return 0.0, 0.0
+    if k == 1:
+        return rho / (1 + rho), rho / (1 + rho)
+    # Probability of j arrivals during one (fixed) service time
+    j = np.arange(k)
+    a = np.exp(-rho + j * math.log(rho) - np.array([math.lgamma(x + 1) for x in j]))
+    states = k
+    P = np.zeros((states, states))
+    for i in range(states):
+        base = max(i - 1, 0)
+        for m in range(states - 1 - base):
+            P[i, base + m] = a[m]
+        P[i, states - 1] = 1.0 - P[i, :states - 1].sum()
+    # Solve pi P = pi with sum(pi) = 1
+    A = np.vstack((P.T - np.eye(states), np.ones(states)))
+    b = np.zeros(states + 1)
+    b[-1] = 1.0
+    pi = np.linalg.lstsq(A, b, rcond=-1)[0]
+    norm = pi[0] + rho
+    p = np.append(pi / norm, 1.0 - 1.0 / norm)
+    return p[k], (p * np.arange(k + 1)).sum()
+
+
+def md1k(rho, k):
+    rho = np.asarray(rho, dtype=float)
+    result = np.array([md1k_one(r, k) for r in rho.ravel()]).reshape(rho.shape + (2,))
+    return result[..., 0], result[..., 1]
+
+
+def predict(uploaders, queue_length, rate, on_off_rate, model="md1k",
+            segment_size=TCP_SEGMENT_SIZE):
+    # Predicted loss probability, queueing delay (seconds, including the
+    # transmission) and throughput (bit/s) of the bottleneck for every number
+    # of uploaders
+    if model not in MODELS:
+        raise ValueError("unknown queue model %s" % model)
+    k = int(queue_length) + 1
+    rho = offered_load(uploaders, on_off_rate, rate)
+    if model == "mm1k":
+        loss, number = mm1k(rho, k)
+    else:
+        loss, number = md1k(rho, k)
+    service = packet_bits(segment_size) / float(rate)
+    arrivals = rho / service * (1 - loss)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delay = np.where(arrivals > 0, number / arrivals, service)
+    return {
+        "load": rho,
+        "loss": loss,
+        "delay": delay,
+        "throughput": arrivals * packet_bits(segment_size),
+    }
+
+
+def interesting(loss, low, high):
+    # Points whose predicted loss is between low and high, plus the
+    # neighbouring point on each side so the transition is bracketed. When
+    # the loss jumps over the whole band between two neighbouring points,
+    # both of them are kept.
+    loss = np.asarray(loss)
+    inside = (loss >= low) & (loss <= high)
+    keep = inside.copy()
+    keep[1:] |= inside[:-1]
+    keep[:-1] |= inside[1:]
+    jump = ((loss[:-1] < low) & (loss[1:] > high)) | ((loss[:-1] > high) & (loss[1:] < low))
+    keep[:-1] |= jump
+    keep[1:] |= jump
+    return keep
+
+
+if __name__ == "__main__":
+    args = [float(x) for x in sys.argv[1:]]
+    defaults = [1, 500000, 300000, 1000, 100]
+    queue_length, rate, on_off_rate, u_max, u_step = (args + defaults[len(args):])[:5]
+    uploaders = np.arange(0, u_max, u_step)
+    mm = predict(uploaders, queue_length, rate, on_off_rate, "mm1k")
+    md = predict(uploaders, queue_length, rate, on_off_rate, "md1k")
+    print("uploaders   load   loss M/M/1/K  loss M/D/1/K  delay M/D/1/K")
+    for i, u in enumerate(uploaders):
+        print("%9i %6.2f %13.4f %13.4f %12.4fs" %
+              (u, md["load"][i], mm["loss"][i], md["loss"][i], md["delay"][i]))
@@ -0,0 +1,100 @@
+#!/usr/bin/python
+#
+# Adaptive sampling of a two dimensional parameter grid.
+#
+# The grid is first sampled at the corners of coarse cells. Cells where the
+# sampled values differ by more than a threshold (relative to the range of all
+# values sampled so far) are split in four and their new corners sampled, until
+# the cells are smooth or can't be split any further. The rest of the grid is
+# filled in by bilinear interpolation within each cell.
+
+import numpy as np
+
+
+def edges(lo, hi, step):
+    e = list(range(lo, hi, max(1, step)))
+    if not e or e[-1] != hi:
+        e.append(hi)
+    return e
+
+
+def corners(cell):
+    x0, x1, y0, y1 = cell
+    return [(x0, y0), (x1, y0), (x0, y1), (x1, y1)]
+
+
+def split(cell):
+    x0, x1, y0, y1 = cell
+    xs = [(x0, x1)]
+    if x1 - x0 >= 2:
+        xm = (x0 + x1) // 2
+        xs = [(x0, xm), (xm, x1)]
+    ys = [(y0, y1)]
+    if y1 - y0 >= 2:
+        ym = (y0 + y1) // 2
+        ys = [(y0, ym), (ym, y1)]
+    return [(a, b, c, d) for a, b in xs for c, d in ys]
+
+
+def refine(evaluate, x_range, y_range, step, threshold):
+    # evaluate is called with a list of (x, y) points and returns a list with
+    # one value per point. A value may also be a (mean, ci) pair, in which case
+    # cells with a noisy corner are refined as well.
+    #
+    # Returns a dict of sampled (x, y) -> mean and the list of leaf cells as
+    # (x0, x1, y0, y1) tuples.
+    values = dict()
+    noise = dict()
+
+    def sample(points):
+        new = sorted(set(p for p in points if p not in values))
+        if not new:
+            return
+        for p, v in zip(new, evaluate(new)):
+            if isinstance(v, (tuple, list)):
+                values[p], noise[p] = float(v[0]), float(v[1])
+            else:
+                values[p] = float(v)
+
+    xe = edges(x_range[0], x_range[1], step)
+    ye = edges(y_range[0], y_range[1], step)
+    cells = [(x0, x1, y0, y1) for x0, x1 in zip(xe, xe[1:] or xe)
+             for y0, y1 in zip(ye, ye[1:] or ye)]
+    sample([c for cell in cells for c in corners(cell)])
+
+    leaves = list()
+    while cells:
+        scale = max(values.values()) - min(values.values())
+        limit = threshold * scale
+        children = list()
+        for cell in cells:
+            v = [values[c] for c in corners(cell)]
+            noisy = max(noise.get(c, 0.0) for c in corners(cell)) > limit
+            parts = split(cell)
+            if (max(v) - min(v) > limit or noisy) and len(parts) > 1:
+                children.extend(parts)
+            else:
+                leaves.append(cell)
+        sample([c for cell in children for c in corners(cell)])
+        cells = children
+    return values, leaves
+
+
+def interpolate(values, leaves, x_range, y_range):
+    # Returns a (y, x) indexed array covering the whole grid, as used by
+    # plot_surface with meshgrid(x, y)
+    xs = x_range[1] - x_range[0] + 1
+    ys = y_range[1] - y_range[0] + 1
+    z = np.zeros((ys, xs))
+    for x0, x1, y0, y1 in leaves:
+        fx = (np.arange(x0, x1 + 1) - x0) / float(max(x1 - x0, 1))
+        fy = (np.arange(y0, y1 + 1) - y0) / float(max(y1 - y0, 1))
+        fx, fy = np.meshgrid(fx, fy)
+        z[y0 - y_range[0]:y1 - y_range[0] + 1, x0 - x_range[0]:x1 - x_range[0] + 1] = (
+            values[(x0, y0)] * (1 - fx) * (1 - fy) +
+            values[(x1, y0)] * fx * (1 - fy) +
+            values[(x0, y1)] * (1 - fx) * fy +
+            values[(x1, y1)] * fx * fy)
+    for (x, y), v in values.items():
+        z[y - y_range[0], x - x_range[0]] = v
+    return z
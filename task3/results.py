@@ -0,0 +1,90 @@
+#!/usr/bin/python
+#
+# Columnar store for sweep results.
+#
+# A sweep is written in one go as a compressed .npz file holding one array per
+# column, one row per simulation run. Loading a file is a handful of array
+# reads, no matter how many runs it holds. Use results.r to load the files
+# from R.
+#
+# usage: results.py <results file> [<results file> ...]
+
+import sys
+import os
+import time
+import numpy as np
+
+DEFAULT_DIR = "results"
+
+# Column name and type of every column in a results file
+COLUMNS = (
+    ("downloaders", "i4"),
+    ("uploaders", "i4"),
+    ("queue_length", "i4"),
+    ("rate", "f8"),
+    ("latency", "f8"),
+    ("error_rate", "f8"),
+    ("on_off_rate", "f8"),
+    ("seed", "i8"),
+    ("run", "i8"),              # replication index of the sweep point
+    ("rng_run", "i8"),          # ns-3 run number
+    ("throughput", "f8"),       # Mbps
+    ("packet_loss", "i8"),      # lost packets
+    ("tx_bytes", "i8"),
+    ("rx_bytes", "i8"),
+    ("first_tx", "f8"),         # time of first transmitted packet in seconds
+    ("last_rx", "f8"),          # time of last received packet in seconds
+)
+
+
+def new_path(name, directory=DEFAULT_DIR):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    return os.path.join(directory, name + "-" + time.strftime("%Y%m%d-%H%M%S") + ".npz")
+
+
+def save(path, rows):
+    # rows is a list of dicts with one value for every column
+    columns = dict()
+    for name, dtype in COLUMNS:
+        columns[name] = np.array([row[name] for row in rows], dtype=dtype)
+    np.savez_compressed(path, **columns)
+
+
+def load(path):
+    # Returns a dict of column name to array
+    f = np.load(path)
+    try:
+        return dict((name, f[name]) for name in f.files)
+    finally:
+        f.close()
+
+
+def load_many(paths):
+    # Concatenates the columns of several results files
+    tables = [load(path) for path in paths]
+    if not tables:
+        return dict((name, np.zeros(0, dtype=dtype)) for name, dtype in COLUMNS)
+    return dict((name, np.concatenate([t[name] for t in tables])) for name, dtype in COLUMNS)
+
+
+def group_by(table, column):
+    # Yields (value, row index array) for every distinct value of a column
+    values = table[column]
+    order = np.argsort(values, kind="mergesort")
+    keys, starts = np.unique(values[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    for key, start, end in zip(keys, starts, ends):
+        yield key, order[start:end]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.stderr.write("usage: %s <results file> [<results file> ...]\n" % sys.argv[0])
+        sys.exit(1)
+    table = load_many(sys.argv[1:])
+    print("%i runs" % len(table["run"]))
+    for uploaders, rows in group_by(table, "uploaders"):
+        print("Uploaders: %i  runs: %i  throughput: %f  packet loss: %f" %
+              (uploaders, len(rows), table["throughput"][rows].mean(),
+               table["packet_loss"][rows].mean()))
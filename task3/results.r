@@ -0,0 +1,31 @@
+# Load sweep results written by results.py into an R data frame.
+#
+# Needs the reticulate package and a python with numpy.
+#
+#   source("results.r")
+#   d = load_results("results/sim5-20150101-120000.npz")
+#   summarise_results(d, "throughput")
+
+require(reticulate)
+
+load_results = function(paths) {
+    np = import("numpy", convert = FALSE)
+    frames = lapply(paths, function(path) {
+        f = np$load(path)
+        columns = py_to_r(f$files)
+        d = as.data.frame(lapply(columns, function(name) py_to_r(f$get(name))))
+        names(d) = columns
+        f$close()
+        d
+    })
+    do.call(rbind, frames)
+}
+
+# Mean, standard deviation and 95% confidence interval per uploader count
+summarise_results = function(d, column) {
+    s = do.call(rbind, lapply(split(d[[column]], d$uploaders), function(x) {
+        n = length(x)
+        c(n = n, mean = mean(x), sd = sd(x), ce = qt(0.975, n - 1) * sd(x) / sqrt(n))
+    }))
+    data.frame(uploaders = as.numeric(rownames(s)), s)
+}
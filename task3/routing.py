@@ -0,0 +1,63 @@
+#!/usr/bin/python
+#
+# Static routes for star and dumbbell topologies.
+#
+# Ipv4GlobalRoutingHelper.PopulateRoutingTables() runs a shortest path search
+# from every node over the whole graph. In a star all a leaf needs is a default
+# route to the hub, and the hub only needs routes for what isn't directly
+# connected to it, so those routes are installed directly with the static
+# routing protocol that InternetStackHelper puts on every node. Routes to a
+# whole group of links use the blocks from SubnetAllocator.prefixes().
+#
+# That this makes the routing setup faster is expected, not measured: the
+# second table of bench_topology.py times it but has not been run with the
+# ns-3 version and bindings the sims use.
+#
+# MODES are the values of the routing option of the sim scripts.
+
+import ns.internet
+import ns.network
+import addressing
+import topology
+
+GLOBAL = "global"
+STATIC = "static"
+MODES = (GLOBAL, STATIC)
+
+
+def check_mode(mode):
+    if mode not in MODES:
+        raise ValueError("unknown routing mode %s, use one of %s" % (mode, ", ".join(MODES)))
+
+
+def _static_routing(node, device):
+    # Static routing protocol of a node and the interface of one of its devices
+    ipv4 = node.GetObject(ns.internet.Ipv4.GetTypeId())
+    static = ns.internet.Ipv4StaticRoutingHelper().GetStaticRouting(ipv4)
+    return static, ipv4.GetInterfaceForDevice(device)
+
+
+def default_route(node, device, next_hop):
+    # Everything not directly connected goes to next_hop through device
+    static, interface = _static_routing(node, device)
+    static.SetDefaultRoute(next_hop, interface)
+
+
+def kind_routes(node, device, next_hop, allocator, kind):
+    # Routes to all links of one kind of the allocator through device
+    static, interface = _static_routing(node, device)
+    for network, prefix in allocator.prefixes(kind):
+        static.AddNetworkRouteTo(ns.network.Ipv4Address(network),
+                                 ns.network.Ipv4Mask(addressing.mask_str(prefix)),
+                                 next_hop, interface)
+
+
+def route_star(star):
+    # Default route from every leaf to the hub. Addresses must be assigned.
+    for i in range(len(star)):
+        default_route(star.leaf(i), star.device(i, topology.LEAF),
+                      star.address(i, topology.HUB))
+
+
+def populate_global():
+    ns.internet.Ipv4GlobalRoutingHelper.PopulateRoutingTables()
@@ -0,0 +1,58 @@
+#!/usr/bin/python
+#
+# Deterministic seeding of simulation runs.
+#
+# All runs use the same base seed and get their own ns-3 run number, which
+# selects an independent substream of the random number generator. The run
+# number is derived from the position of the run in the sweep, so every run
+# can be repeated exactly and no two runs of a sweep share a stream, no matter
+# which worker process they end up in.
+
+import ns.applications
+import ns.core
+import ns.network
+
+BASE_SEED = 1
+
+# Bits per index packed into a run number
+INDEX_BITS = 20
+
+
+def run_number(*indices):
+    # Packs up to three indices (e.g. downloaders, uploaders, replication)
+    # into one run number
+    if len(indices) > 64 // INDEX_BITS:
+        raise ValueError("too many indices for a run number")
+    run = 0
+    for i in indices:
+        if i < 0 or i >= 2**INDEX_BITS:
+            raise ValueError("index out of range for a run number: %i" % i)
+        run = (run << INDEX_BITS) | i
+    return run
+
+
+def seed_rng(seed, run):
+    ns.core.RngSeedManager.SetSeed(seed)
+    ns.core.RngSeedManager.SetRun(run)
+
+
+# Fixed random number streams, so that competing configurations run with the
+# same random draws (common random numbers). Streams are handed out per node,
+# so a client keeps its streams when clients are added to or removed from the
+# end of the node list.
+ERROR_MODEL_STREAM = 0
+STREAMS_PER_NODE = 1024
+
+
+def node_stream(index):
+    return 1 + index * STREAMS_PER_NODE
+
+
+def assign_streams(nodes, error_model=None):
+    if error_model is not None:
+        error_model.AssignStreams(ERROR_MODEL_STREAM)
+    # The helper is only used for its AssignStreams, which walks the
+    # OnOffApplications installed on the given nodes
+    helper = ns.applications.OnOffHelper("ns3::TcpSocketFactory", ns.network.Address())
+    for i in range(nodes.GetN()):
+        helper.AssignStreams(ns.network.NodeContainer(nodes.Get(i)), node_stream(i))
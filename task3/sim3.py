@@ -12,6 +12,22 @@ from matplotlib import cm
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.pyplot as plt
 import numpy as np
+import cache
+import refine
+import checkpoint
+import seeding
+import topology
+import addressing
+import routing
+import packet_sinks
+
+# Bump this when sim() changes in a way that makes cached results invalid
+SIM_VERSION = 5
+
+QUEUE_LENGTH = 5
+TCP_SEGMENT_SIZE = 1448
+TCP_RETX_THRESHOLD = 4
+TCP_WESTWOOD_PROTOCOL = "WestwoodPlus"
 
 ################################################################################
 # COMMAND LINE PARSING
@@ -26,246 +42,299 @@ cmd.start_d = 1
 cmd.start_u = 1
 cmd.downloading_clients = 100
 cmd.uploading_clients = 100
+cmd.seed = seeding.BASE_SEED
+cmd.adaptive = 0        # refine a coarse grid instead of simulating every point
+cmd.coarse_step = 10    # cell size of the coarse grid
+cmd.threshold = 0.05    # refine cells whose values differ more than this fraction of the range
+cmd.cache = 1
+cmd.cache_dir = cache.DEFAULT_DIR
+cmd.cache_size = 100    # cache size limit in MB
+cmd.checkpoint = "sim3.checkpoint"
+cmd.routing = routing.GLOBAL    # global or static routes
 cmd.AddValue ("rate", "P2P data rate in bps")
 cmd.AddValue ("latency", "P2P link Latency in miliseconds")
 cmd.AddValue ("on_off_rate", "OnOffApplication data sending rate")
 cmd.AddValue ("downloading_clients", "Number of downloading clients")
 cmd.AddValue ("uploading_clients", "Number of uploading clients")
+cmd.AddValue ("seed", "Base seed, every grid point gets its own run number")
+cmd.AddValue ("adaptive", "Adaptive grid refinement (0 or 1)")
+cmd.AddValue ("coarse_step", "Coarse grid step for adaptive refinement")
+cmd.AddValue ("threshold", "Relative throughput difference that makes a cell get refined")
+cmd.AddValue ("cache", "Use the result cache (0 or 1)")
+cmd.AddValue ("cache_dir", "Result cache directory")
+cmd.AddValue ("cache_size", "Result cache size limit in MB")
+cmd.AddValue ("checkpoint", "Checkpoint file to resume an interrupted grid from")
+cmd.AddValue ("routing", "global (shortest paths over the whole graph) or static (default routes)")
 
 cmd.Parse(sys.argv)
+routing.check_mode(str(cmd.routing))
 
-z = [[0 for x in range(int(cmd.uploading_clients))] for x in range(int(cmd.downloading_clients))]
 
-for dl in range(cmd.start_d, int(cmd.downloading_clients) + 1):
-    for ul in range(cmd.start_u, int(cmd.uploading_clients) + 1):
-
-
-        #######################################################################################
-        # CREATE NODES
-
-        nodes = ns.network.NodeContainer()
-        nodes.Create(2)
-
-        downloading_nodes = ns.network.NodeContainer()
-        downloading_nodes.Create(dl)
-
-        uploading_nodes = ns.network.NodeContainer()
-        uploading_nodes.Create(ul)
-
-        ################################################################################
-        # CONNECT NODES WITH POINT-TO-POINT CHANNEL
-
-        # set default queue length to 5 packets (used by NetDevices)
-        ns.core.Config.SetDefault("ns3::DropTailQueue::MaxPackets", ns.core.UintegerValue(5))
+def sim(dl, ul, cmd):
+    seeding.seed_rng(int(cmd.seed), seeding.run_number(dl, ul))
+
+    #######################################################################################
+    # CREATE NODES
+
+    nodes = ns.network.NodeContainer()
+    nodes.Create(2)
+
+    # The downloading and uploading clients are created with their stars below
+
+    ################################################################################
+    # CONNECT NODES WITH POINT-TO-POINT CHANNEL
+
+    # set default queue length to 5 packets (used by NetDevices)
+    ns.core.Config.SetDefault("ns3::DropTailQueue::MaxPackets", ns.core.UintegerValue(QUEUE_LENGTH))
+
+    ################################################################################
+    # INSTALL NETWORK DEVICES
+    #
+    # The server is linked to the bottleneck node, the clients are the leaves of
+    # two stars around the bottleneck node, one for each kind of client.
+
+    # create point-to-point helper with common attributes
+    pointToPoint = ns.point_to_point.PointToPointHelper()
+    pointToPoint.SetDeviceAttribute("Mtu", ns.core.UintegerValue(1500))
+    pointToPoint.SetDeviceAttribute("DataRate",
+                                ns.network.DataRateValue(ns.network.DataRate(int(cmd.rate))))
+    pointToPoint.SetChannelAttribute("Delay",
+                                ns.core.TimeValue(ns.core.MilliSeconds(int(cmd.latency))))
+
+    dSdB = pointToPoint.Install(nodes)
+    downloaders = topology.create_star(nodes.Get(1), dl, pointToPoint)
+    uploaders = topology.create_star(nodes.Get(1), ul, pointToPoint)
+
+    # Here we can introduce an error model on the bottle-neck link (from node 4 to 5)
+    #em = ns.network.RateErrorModel()
+    #em.SetAttribute("ErrorUnit", ns.core.StringValue("ERROR_UNIT_PACKET"))
+    #em.SetAttribute("ErrorRate", ns.core.DoubleValue(0.02))
+    #d4d5.Get(1).SetReceiveErrorModel(em)
+
+    ################################################################################
+    # CONFIGURE TCP
+    #
+    # Choose a TCP version and set some attributes.
+
+    # Set a TCP segment size (this should be inline with the channel MTU)
+    ns.core.Config.SetDefault("ns3::TcpSocket::SegmentSize", ns.core.UintegerValue(TCP_SEGMENT_SIZE))
+
+    # If you want, you may set a default TCP version here. It will affect all TCP
+    # connections created in the simulator. If you want to simulate different TCP versions
+    # at the same time, see below for how to do that.
+    #ns.core.Config.SetDefault("ns3::TcpL4Protocol::SocketType",
+    #                          ns.core.StringValue("ns3::TcpTahoe"))
+    #                          ns.core.StringValue("ns3::TcpReno"))
+    #                          ns.core.StringValue("ns3::TcpNewReno"))
+    #                          ns.core.StringValue("ns3::TcpWestwood"))
+
+    # Some examples of attributes for some of the TCP versions.
+    ns.core.Config.SetDefault("ns3::TcpNewReno::ReTxThreshold", ns.core.UintegerValue(TCP_RETX_THRESHOLD))
+    ns.core.Config.SetDefault("ns3::TcpWestwood::ProtocolType",
+                              ns.core.StringValue(TCP_WESTWOOD_PROTOCOL))
+
+
+    ################################################################################
+    # CREATE A PROTOCOL STACK
+
+    stack = ns.internet.InternetStackHelper()
+    stack.Install(nodes)
+    stack.Install(downloaders.leaves)
+    stack.Install(uploaders.leaves)
+
+    ################################################################################
+    # ASSIGN IP ADDRESSES FOR NET DEVICES
+
+    # Every link gets its own /30 from 10.0.0.0/8
+    address = addressing.SubnetAllocator()
+    ifSifB = address.assign("server", dSdB)
+    downloaders.assign(address, "downloaders")
+    uploaders.assign(address, "uploaders")
+
+    # Turn on global static routing so we can actually be routed across the network.
+    # With static routing the clients and the server get a default route to the
+    # bottleneck node, which is directly connected to every network.
+    if str(cmd.routing) == routing.GLOBAL:
+        routing.populate_global()
+    else:
+        routing.route_star(downloaders)
+        routing.route_star(uploaders)
+        routing.default_route(nodes.Get(0), dSdB.Get(0), ifSifB.GetAddress(1))
+
+    #print(ifSifB.GetAddress(0))
+
+
+    ################################################################################
+    # CREATE TCP APPLICATION AND CONNECTION
+
+    # One TCP sink per destination node, shared by all connections to it
+    sinks = packet_sinks.Sinks(2.0, 50.0)
+
+    def SetupTcpConnection(srcNode, dstNode, dstAddr, startTime, stopTime):
+      # Create a TCP sink at dstNode, unless it already has one
+      sinks.get(dstNode)
+
+      # Create TCP connection from srcNode to dstNode
+      on_off_tcp_helper = ns.applications.OnOffHelper("ns3::TcpSocketFactory",
+                              ns.network.Address(ns.network.InetSocketAddress(dstAddr, 8080)))
+      on_off_tcp_helper.SetAttribute("DataRate",
+                          ns.network.DataRateValue(ns.network.DataRate(int(cmd.on_off_rate))))
+      on_off_tcp_helper.SetAttribute("PacketSize", ns.core.UintegerValue(1500))
+      on_off_tcp_helper.SetAttribute("OnTime",
+                          ns.core.StringValue("ns3::ConstantRandomVariable[Constant=2]"))
+      on_off_tcp_helper.SetAttribute("OffTime",
+                            ns.core.StringValue("ns3::ConstantRandomVariable[Constant=1]"))
+      #                      ns.core.StringValue("ns3::UniformRandomVariable[Min=1,Max=2]"))
+      #                      ns.core.StringValue("ns3::ExponentialRandomVariable[Mean=2]"))
+
+      # Install the client on node srcNode
+      client_apps = on_off_tcp_helper.Install(srcNode)
+      client_apps.Start(startTime)
+      client_apps.Stop(stopTime)
+
+    for i in range(0, dl):
+        n = downloaders.leaf(i)
+        SetupTcpConnection(nodes.Get(0), n, downloaders.address(i, topology.LEAF), ns.core.Seconds(2.0), ns.core.Seconds(40.0))
+    for i in range(0, ul):
+        n = uploaders.leaf(i)
+        SetupTcpConnection(n, nodes.Get(0), ifSifB.GetAddress(0), ns.core.Seconds(2.0), ns.core.Seconds(40.0))
+
+    #######################################################################################
+    # CREATE A PCAP PACKET TRACE FILE
+    #
+    # This line creates two trace files based on the pcap file format. It is a packet
+    # trace dump in a binary file format. You can use Wireshark to open these files and
+    # inspect every transmitted packets. Wireshark can also draw simple graphs based on
+    # these files.
+    #
+    # You will get two files, one for node 0 and one for node 1
+
+    #pointToPoint.EnablePcap("sim-tcp", d0d4.Get(0), True)
+    #pointToPoint.EnablePcap("sim-tcp", d1d4.Get(0), True)
+
+    #######################################################################################
+    # FLOW MONITOR
+    #
+    # Here is a better way of extracting information from the simulation. It is based on
+    # a class called FlowMonitor. This piece of code will enable monitoring all the flows
+    # created in the simulator. There are four flows in our example, one from the client to
+    # server and one from the server to the client for both TCP connections.
+
+    flowmon_helper = ns.flow_monitor.FlowMonitorHelper()
+    monitor = flowmon_helper.InstallAll()
+
+    #######################################################################################
+    # RUN THE SIMULATION
+    #
+    # We have to set stop time, otherwise the flowmonitor causes simulation to run forever
+
+    ns.core.Simulator.Stop(ns.core.Seconds(50.0))
+    ns.core.Simulator.Run()
+
+    #######################################################################################
+    # FLOW MONITOR ANALYSIS
+    #
+    # Simulation is finished. Let's extract the useful information from the FlowMonitor and
+    # print it on the screen.
+
+    # check for lost packets
+    monitor.CheckForLostPackets()
+
+    classifier = flowmon_helper.GetClassifier()
+
+    throughput = 0.0
+    for flow_id, flow_stats in monitor.GetFlowStats():
+        if flow_id == 1:
+            t = classifier.FindFlow(flow_id)
+            proto = {6: 'TCP', 17: 'UDP'} [t.protocol]
+            print ("FlowID: %i (%s %s/%s --> %s/%i)" %
+                   (flow_id, proto, t.sourceAddress, t.sourcePort, t.destinationAddress, t.destinationPort))
+            #
+            # print ("  Tx Bytes: %i" % flow_stats.txBytes)
+            # print ("  Rx Bytes: %i" % flow_stats.rxBytes)
+            # print ("  Lost Pkt: %i" % flow_stats.lostPackets)
+            # print ("  Flow active: %fs - %fs" % (flow_stats.timeFirstTxPacket.GetSeconds(),
+            #                                    flow_stats.timeLastRxPacket.GetSeconds()))
+
+            print("D: " + str(dl) + "     U: " + str(ul))
+            print ("  Throughput: %f Mbps" % (flow_stats.rxBytes *
+                                             8.0 /
+                                             (flow_stats.timeLastRxPacket.GetSeconds()
+                                               - flow_stats.timeFirstTxPacket.GetSeconds())/
+                                             1024/
+                                             1024))
+
+            #index = (dl-1) + (ul-1) * int(cmd.downloading_clients)
+            #print(index)
+            #z[dl-1][ul-1] = (flow_stats.rxBytes *
+            throughput = (flow_stats.rxBytes *
+                                             8.0 /
+                                             (flow_stats.timeLastRxPacket.GetSeconds()
+                                               - flow_stats.timeFirstTxPacket.GetSeconds())/
+                                             1024/
+                                             1024)
+    # This is what we want to do last
+    ns.core.Simulator.Destroy()
+    return throughput
+
+def scenario(dl, ul, cmd):
+    # Everything that affects the outcome of one sim() run, used as cache key
+    return {
+        "sim": "sim3",
+        "version": SIM_VERSION,
+        "downloaders": dl,
+        "uploaders": ul,
+        "seed": int(cmd.seed),
+        "latency": float(cmd.latency),
+        "rate": float(cmd.rate),
+        "on_off_rate": float(cmd.on_off_rate),
+        "queue_length": QUEUE_LENGTH,
+        "tcp_segment_size": TCP_SEGMENT_SIZE,
+        "tcp_retx_threshold": TCP_RETX_THRESHOLD,
+        "tcp_westwood_protocol": TCP_WESTWOOD_PROTOCOL,
+    }
+
+
+z = [[0 for x in range(int(cmd.uploading_clients))] for x in range(int(cmd.downloading_clients))]
 
-        nSnB = ns.network.NodeContainer()
-        nSnB.Add(nodes.Get(0))
-        nSnB.Add(nodes.Get(1))
-
-        nDnB = list()
-        for i in range(0, dl):
-            link = ns.network.NodeContainer()
-            link.Add(downloading_nodes.Get(i))
-            link.Add(nodes.Get(1))
-            nDnB.append(link)
-
-        nUnB = list()
-        for i in range(0, ul):
-            link = ns.network.NodeContainer()
-            link.Add(uploading_nodes.Get(i))
-            link.Add(nodes.Get(1))
-            nUnB.append(link)
-
-        ################################################################################
-        # INSTALL NETWORK DEVICES
-
-        # create point-to-point helper with common attributes
-        pointToPoint = ns.point_to_point.PointToPointHelper()
-        pointToPoint.SetDeviceAttribute("Mtu", ns.core.UintegerValue(1500))
-        pointToPoint.SetDeviceAttribute("DataRate",
-                                    ns.network.DataRateValue(ns.network.DataRate(int(cmd.rate))))
-        pointToPoint.SetChannelAttribute("Delay",
-                                    ns.core.TimeValue(ns.core.MilliSeconds(int(cmd.latency))))
-
-        dSdB = pointToPoint.Install(nSnB)
-        dDdB = list()
-        for n in nDnB:
-            dDdB.append(pointToPoint.Install(n))
-        dUdB = list()
-        for n in nUnB:
-            dUdB.append(pointToPoint.Install(n))
-
-        # Here we can introduce an error model on the bottle-neck link (from node 4 to 5)
-        #em = ns.network.RateErrorModel()
-        #em.SetAttribute("ErrorUnit", ns.core.StringValue("ERROR_UNIT_PACKET"))
-        #em.SetAttribute("ErrorRate", ns.core.DoubleValue(0.02))
-        #d4d5.Get(1).SetReceiveErrorModel(em)
-
-        ################################################################################
-        # CONFIGURE TCP
-        #
-        # Choose a TCP version and set some attributes.
-
-        # Set a TCP segment size (this should be inline with the channel MTU)
-        ns.core.Config.SetDefault("ns3::TcpSocket::SegmentSize", ns.core.UintegerValue(1448))
-
-        # If you want, you may set a default TCP version here. It will affect all TCP
-        # connections created in the simulator. If you want to simulate different TCP versions
-        # at the same time, see below for how to do that.
-        #ns.core.Config.SetDefault("ns3::TcpL4Protocol::SocketType",
-        #                          ns.core.StringValue("ns3::TcpTahoe"))
-        #                          ns.core.StringValue("ns3::TcpReno"))
-        #                          ns.core.StringValue("ns3::TcpNewReno"))
-        #                          ns.core.StringValue("ns3::TcpWestwood"))
-
-        # Some examples of attributes for some of the TCP versions.
-        ns.core.Config.SetDefault("ns3::TcpNewReno::ReTxThreshold", ns.core.UintegerValue(4))
-        ns.core.Config.SetDefault("ns3::TcpWestwood::ProtocolType",
-                                  ns.core.StringValue("WestwoodPlus"))
-
-
-        ################################################################################
-        # CREATE A PROTOCOL STACK
-
-        stack = ns.internet.InternetStackHelper()
-        stack.Install(nodes)
-        stack.Install(downloading_nodes)
-        stack.Install(uploading_nodes)
-
-        ################################################################################
-        # ASSIGN IP ADDRESSES FOR NET DEVICES
-
-        address = ns.internet.Ipv4AddressHelper()
-
-        address.SetBase(ns.network.Ipv4Address("10.0.0.0"), ns.network.Ipv4Mask("255.255.255.0"))
-        ifSifB = address.Assign(dSdB)
-        ifDifB = list()
-        for i, d in enumerate(dDdB):
-            address.SetBase(ns.network.Ipv4Address("10.1." + str(i) + ".0"), ns.network.Ipv4Mask("255.255.255.0"))
-            ifDifB.append(address.Assign(d))
-        ifUifB = list()
-        for i, d in enumerate(dUdB):
-            address.SetBase(ns.network.Ipv4Address("10.2." + str(i) + ".0"), ns.network.Ipv4Mask("255.255.255.0"))
-            ifUifB.append(address.Assign(d))
-
-        # Turn on global static routing so we can actually be routed across the network.
-        ns.internet.Ipv4GlobalRoutingHelper.PopulateRoutingTables()
-
-        #print(ifSifB.GetAddress(0))
-
-
-        ################################################################################
-        # CREATE TCP APPLICATION AND CONNECTION
-
-        def SetupTcpConnection(srcNode, dstNode, dstAddr, startTime, stopTime):
-          # Create a TCP sink at dstNode
-          packet_sink_helper = ns.applications.PacketSinkHelper("ns3::TcpSocketFactory",
-                                  ns.network.InetSocketAddress(ns.network.Ipv4Address.GetAny(),
-                                                               8080))
-          sink_apps = packet_sink_helper.Install(dstNode)
-          sink_apps.Start(ns.core.Seconds(2.0))
-          sink_apps.Stop(ns.core.Seconds(50.0))
-
-          # Create TCP connection from srcNode to dstNode
-          on_off_tcp_helper = ns.applications.OnOffHelper("ns3::TcpSocketFactory",
-                                  ns.network.Address(ns.network.InetSocketAddress(dstAddr, 8080)))
-          on_off_tcp_helper.SetAttribute("DataRate",
-                              ns.network.DataRateValue(ns.network.DataRate(int(cmd.on_off_rate))))
-          on_off_tcp_helper.SetAttribute("PacketSize", ns.core.UintegerValue(1500))
-          on_off_tcp_helper.SetAttribute("OnTime",
-                              ns.core.StringValue("ns3::ConstantRandomVariable[Constant=2]"))
-          on_off_tcp_helper.SetAttribute("OffTime",
-                                ns.core.StringValue("ns3::ConstantRandomVariable[Constant=1]"))
-          #                      ns.core.StringValue("ns3::UniformRandomVariable[Min=1,Max=2]"))
-          #                      ns.core.StringValue("ns3::ExponentialRandomVariable[Mean=2]"))
-
-          # Install the client on node srcNode
-          client_apps = on_off_tcp_helper.Install(srcNode)
-          client_apps.Start(startTime)
-          client_apps.Stop(stopTime)
-
-        for i in range(0, dl):
-            n = downloading_nodes.Get(i)
-            SetupTcpConnection(nodes.Get(0), n, ifDifB[i].GetAddress(0), ns.core.Seconds(2.0), ns.core.Seconds(40.0))
-        for i in range(0, ul):
-            n = uploading_nodes.Get(i)
-            SetupTcpConnection(n, nodes.Get(0), ifSifB.GetAddress(0), ns.core.Seconds(2.0), ns.core.Seconds(40.0))
-
-        #######################################################################################
-        # CREATE A PCAP PACKET TRACE FILE
-        #
-        # This line creates two trace files based on the pcap file format. It is a packet
-        # trace dump in a binary file format. You can use Wireshark to open these files and
-        # inspect every transmitted packets. Wireshark can also draw simple graphs based on
-        # these files.
-        #
-        # You will get two files, one for node 0 and one for node 1
-
-        #pointToPoint.EnablePcap("sim-tcp", d0d4.Get(0), True)
-        #pointToPoint.EnablePcap("sim-tcp", d1d4.Get(0), True)
-
-        #######################################################################################
-        # FLOW MONITOR
-        #
-        # Here is a better way of extracting information from the simulation. It is based on
-        # a class called FlowMonitor. This piece of code will enable monitoring all the flows
-        # created in the simulator. There are four flows in our example, one from the client to
-        # server and one from the server to the client for both TCP connections.
-
-        flowmon_helper = ns.flow_monitor.FlowMonitorHelper()
-        monitor = flowmon_helper.InstallAll()
-
-        #######################################################################################
-        # RUN THE SIMULATION
-        #
-        # We have to set stop time, otherwise the flowmonitor causes simulation to run forever
-
-        ns.core.Simulator.Stop(ns.core.Seconds(50.0))
-        ns.core.Simulator.Run()
-
-        #######################################################################################
-        # FLOW MONITOR ANALYSIS
-        #
-        # Simulation is finished. Let's extract the useful information from the FlowMonitor and
-        # print it on the screen.
-
-        # check for lost packets
-        monitor.CheckForLostPackets()
-
-        classifier = flowmon_helper.GetClassifier()
-
-        for flow_id, flow_stats in monitor.GetFlowStats():
-            if flow_id == 1:
-                t = classifier.FindFlow(flow_id)
-                proto = {6: 'TCP', 17: 'UDP'} [t.protocol]
-                print ("FlowID: %i (%s %s/%s --> %s/%i)" %
-                       (flow_id, proto, t.sourceAddress, t.sourcePort, t.destinationAddress, t.destinationPort))
-                #
-                # print ("  Tx Bytes: %i" % flow_stats.txBytes)
-                # print ("  Rx Bytes: %i" % flow_stats.rxBytes)
-                # print ("  Lost Pkt: %i" % flow_stats.lostPackets)
-                # print ("  Flow active: %fs - %fs" % (flow_stats.timeFirstTxPacket.GetSeconds(),
-                #                                    flow_stats.timeLastRxPacket.GetSeconds()))
-
-                print("D: " + str(dl) + "     U: " + str(ul))
-                print ("  Throughput: %f Mbps" % (flow_stats.rxBytes *
-                                                 8.0 /
-                                                 (flow_stats.timeLastRxPacket.GetSeconds()
-                                                   - flow_stats.timeFirstTxPacket.GetSeconds())/
-                                                 1024/
-                                                 1024))
-
-                #index = (dl-1) + (ul-1) * int(cmd.downloading_clients)
-                #print(index)
-                #z[dl-1][ul-1] = (flow_stats.rxBytes *
-                z[ul-1][dl-1] = (flow_stats.rxBytes *
-                                                 8.0 /
-                                                 (flow_stats.timeLastRxPacket.GetSeconds()
-                                                   - flow_stats.timeFirstTxPacket.GetSeconds())/
-                                                 1024/
-                                                 1024)
-        # This is what we want to do last
-        ns.core.Simulator.Destroy()
+result_cache = None
+if int(cmd.cache):
+    result_cache = cache.ResultCache(str(cmd.cache_dir), int(cmd.cache_size) * 1024 * 1024)
+
+journal = checkpoint.Checkpoint(str(cmd.checkpoint))
+if len(journal):
+    print("Resuming from %s, %i points done" % (cmd.checkpoint, len(journal)))
+
+def evaluate(points):
+    values = list()
+    for dl, ul in points:
+        key = scenario(dl, ul, cmd)
+        throughput = journal.get(cache.scenario_hash(key))
+        if throughput is None:
+            if result_cache is not None:
+                throughput = result_cache.get(key)
+            if throughput is None:
+                throughput = sim(dl, ul, cmd)
+                if result_cache is not None:
+                    result_cache.put(key, throughput)
+            journal.record(cache.scenario_hash(key), throughput)
+        values.append(throughput)
+    return values
+
+if int(cmd.adaptive):
+    d_range = (int(cmd.start_d), int(cmd.downloading_clients))
+    u_range = (int(cmd.start_u), int(cmd.uploading_clients))
+    values, cells = refine.refine(evaluate, d_range, u_range,
+                                  int(cmd.coarse_step), float(cmd.threshold))
+    print("Simulated %i of %i grid points" % (len(values),
+          (d_range[1] - d_range[0] + 1) * (u_range[1] - u_range[0] + 1)))
+    z = np.zeros((int(cmd.uploading_clients), int(cmd.downloading_clients)))
+    z[u_range[0]-1:, d_range[0]-1:] = refine.interpolate(values, cells, d_range, u_range)
+else:
+    for dl in range(cmd.start_d, int(cmd.downloading_clients) + 1):
+        for ul in range(cmd.start_u, int(cmd.uploading_clients) + 1):
+            z[ul-1][dl-1] = evaluate([(dl, ul)])[0]
+journal.remove()
 
 fig = plt.figure()
 ax = fig.gca(projection="3d")
@@ -7,10 +7,15 @@ import ns.internet
 import ns.network
 import ns.point_to_point
 import ns.flow_monitor
-import time
+import seeding
+import capture
+import tcptrace
+import topology
+import addressing
+import routing
+import packet_sinks
+import traffic
 
-#TODO make sure more ip addresses can be used
-ns.core.RngSeedManager.SetSeed(int(time.time() * 1000 % (2**31-1)))
 def parse_commands():
     cmd = ns.core.CommandLine()
 
@@ -34,8 +39,26 @@ def parse_commands():
     cmd.s_on_off = 1000       # servers on off rate
     cmd.sim_run_time = 50.0     # the total time the simulation should run
     cmd.error_rate = 0.02        # error rate of packets
+    cmd.seed = seeding.BASE_SEED # base seed of the random number generator
+    cmd.run = 0                 # run number, selects the random number stream
+    cmd.pcap = 0                # capture packets on the server link
+    cmd.pcap_snaplen = 0        # bytes captured per packet, 0 for whole packets
+    cmd.trace = ""              # file for the cwnd and RTT traces of all senders, empty to disable
+    cmd.address_pool = addressing.DEFAULT_POOL             # network the link subnets are taken from
+    cmd.address_pool_prefix = addressing.DEFAULT_POOL_PREFIX
+    cmd.routing = routing.GLOBAL    # global or static routes
+
+    cmd.AddValue ("seed", "Base seed of the random number generator")
+    cmd.AddValue ("run", "Run number, selects the random number stream")
+    cmd.AddValue ("pcap", "Capture packets on the server link (1) or not (0)")
+    cmd.AddValue ("pcap_snaplen", "Bytes captured per packet, 0 for whole packets")
+    cmd.AddValue ("trace", "File for the cwnd and RTT traces of all senders, empty to disable")
+    cmd.AddValue ("address_pool", "Network the link subnets are taken from")
+    cmd.AddValue ("address_pool_prefix", "Prefix length of the address pool")
+    cmd.AddValue ("routing", "global (shortest paths over the whole graph) or static (default routes)")
 
     cmd.Parse(sys.argv)
+    routing.check_mode(str(cmd.routing))
     return cmd
 
 def create_nodes(no_of_downloaders, no_of_uploaders):
@@ -47,54 +70,32 @@ def create_nodes(no_of_downloaders, no_of_uploaders):
     u_nodes.Create(no_of_uploaders)
     return s_node, d_nodes, u_nodes
 
-def link_nodes(s_node, d_nodes, u_nodes, queue_length):
+def install_network_devices(s_node, s_rate, s_latency, d_nodes, d_rate, d_latency, u_nodes, u_rate, u_latency, queue_length):
+    # The clients are the leaves of two stars around the second server node,
+    # one per kind of client so they can have their own rate and latency
     ns.core.Config.SetDefault("ns3::DropTailQueue::MaxPackets", ns.core.UintegerValue(queue_length))
-    s_link = ns.network.NodeContainer()
-    s_link.Add(s_node.Get(0))
-    s_link.Add(s_node.Get(1))
-    d_links = list()
-    for i in range(0, d_nodes.GetN()):
-        link = ns.network.NodeContainer()
-        link.Add(s_node.Get(1))
-        link.Add(d_nodes.Get(i))
-        d_links.append(link)
-    u_links = list()
-    for i in range(0, u_nodes.GetN()):
-        link = ns.network.NodeContainer()
-        link.Add(s_node.Get(1))
-        link.Add(u_nodes.Get(i))
-        u_links.append(link)
-    return s_link, d_links, u_links
-
-def install_network_devices(s_link, s_rate, s_latency, d_links, d_rate, d_latency, u_links, u_rate, u_latency):
     point_to_point = ns.point_to_point.PointToPointHelper()
     point_to_point.SetDeviceAttribute("Mtu", ns.core.UintegerValue(1500))   #maximum transmission unit allowed on internet is 1500 bytes
     point_to_point.SetDeviceAttribute("DataRate", ns.network.DataRateValue(ns.network.DataRate(d_rate)))
     point_to_point.SetChannelAttribute("Delay", ns.core.TimeValue(ns.core.MilliSeconds(d_latency)))
-    d_devices = list()
-    for link in d_links:
-        d_devices.append(point_to_point.Install(link))
+    d_star = topology.Star(s_node.Get(1), d_nodes, point_to_point)
 
     point_to_point.SetDeviceAttribute("DataRate", ns.network.DataRateValue(ns.network.DataRate(u_rate)))
     point_to_point.SetChannelAttribute("Delay", ns.core.TimeValue(ns.core.MilliSeconds(u_latency)))
-    u_devices = list()
-    for link in u_links:
-        u_devices.append(point_to_point.Install(link))
+    u_star = topology.Star(s_node.Get(1), u_nodes, point_to_point)
 
     point_to_point.SetDeviceAttribute("DataRate", ns.network.DataRateValue(ns.network.DataRate(s_rate)))
     point_to_point.SetChannelAttribute("Delay", ns.core.TimeValue(ns.core.MilliSeconds(s_latency)))
-    s_device = point_to_point.Install(s_link)
-
-    #Enable Pcap here
-    point_to_point.EnablePcap("sim4", s_device.Get(0), True)
+    s_device = point_to_point.Install(s_node)
 
-    return s_device, d_devices, u_devices
+    return s_device, d_star, u_star
 
 def set_error_model(s_device, error_rate):
     em = ns.network.RateErrorModel()
     em.SetAttribute("ErrorUnit", ns.core.StringValue("ERROR_UNIT_PACKET"))
     em.SetAttribute("ErrorRate", ns.core.DoubleValue(error_rate))
     s_device.Get(0).SetReceiveErrorModel(em)
+    return em
 
 def configure_tcp():
     ns.core.Config.SetDefault("ns3::TcpSocket::SegmentSize", ns.core.UintegerValue(1448))
@@ -109,65 +110,47 @@ def create_protocol_stack(s_node, d_nodes, u_nodes):
     stack.Install(u_nodes)
     return stack
 
-def assign_ip(s_devices, s_ip, s_mask, d_devices, d_ip, d_mask, u_devices, u_ip, u_mask):
-    address = ns.internet.Ipv4AddressHelper()
-    #ip = s_ip.replace("x", str((i & 65280) >> 8), 1)
-    #ip = ip.replace("x", str(i & 255), 1)
-    address.SetBase(ns.network.Ipv4Address(s_ip.replace("x", str(0))), ns.network.Ipv4Mask(s_mask))
-    #address.SetBase(ns.network.Ipv4Address(ip), ns.network.Ipv4Mask(s_mask))
-    s_addr = address.Assign(s_devices)
-    d_addr = list()
-    for i, d in enumerate(d_devices):
-        ip = d_ip.replace("x", str((i & 65280) >> 8), 1)
-        ip = ip.replace("x", str(i & 255), 1)
-        #print(ip)
-        #address.SetBase(ns.network.Ipv4Address(d_ip.replace("x", str(i))), ns.network.Ipv4Mask(d_mask))
-        address.SetBase(ns.network.Ipv4Address(ip), ns.network.Ipv4Mask(d_mask))
-        d_addr.append(address.Assign(d))
-    u_addr = list()
-    for i, d in enumerate(u_devices):
-        ip = u_ip.replace("x", str((i & 65280) >> 8), 1)
-        ip = ip.replace("x", str(i & 255), 1)
-        #address.SetBase(ns.network.Ipv4Address(u_ip.replace("x", str(i))), ns.network.Ipv4Mask(u_mask))
-        address.SetBase(ns.network.Ipv4Address(ip), ns.network.Ipv4Mask(u_mask))
-        u_addr.append(address.Assign(d))
-    return s_addr, d_addr, u_addr
-
-def setup_tcp_connection(src_node, dst_node, dst_addr, start_time, stop_time, on_off_rate):
-    packet_sink_helper = ns.applications.PacketSinkHelper("ns3::TcpSocketFactory",
-        ns.network.InetSocketAddress(ns.network.Ipv4Address.GetAny(), 8080))
-    sink_apps = packet_sink_helper.Install(dst_node)
-    sink_apps.Start(ns.core.Seconds(2.0))
-    sink_apps.Stop(ns.core.Seconds(50.0))
-
-    on_off_tcp_helper = ns.applications.OnOffHelper("ns3::TcpSocketFactory",
-        ns.network.Address(ns.network.InetSocketAddress(dst_addr, 8080)))
-    on_off_tcp_helper.SetAttribute("DataRate",
-        ns.network.DataRateValue(ns.network.DataRate(on_off_rate)))
-    on_off_tcp_helper.SetAttribute("PacketSize",
-        ns.core.UintegerValue(1500))
-    on_off_tcp_helper.SetAttribute("OnTime",
-        ns.core.StringValue("ns3::ConstantRandomVariable[Constant=2]"))
-    on_off_tcp_helper.SetAttribute("OffTime",
-        ns.core.StringValue("ns3::ConstantRandomVariable[Constant=1]"))
-    #    ns.core.StringValue("ns3::UniformRandomVariable[Min=1,Max=2]"))
-    #    ns.core.StringValue("ns3::ExponentialRandomVariable[Mean=2]"))
-
-    client_apps = on_off_tcp_helper.Install(src_node)
-    client_apps.Start(start_time)
-    client_apps.Stop(stop_time)
-
-def setup_downloaders(s_node, d_nodes, d_ips, start_time, stop_time, on_off_rate):
-    for i in range(0, d_nodes.GetN()):
-        node = d_nodes.Get(i)
-        server = s_node.Get(0)
-        setup_tcp_connection(server, node, d_ips[i].GetAddress(0), ns.core.Seconds(start_time), ns.core.Seconds(stop_time), on_off_rate)
-
-def setup_uploaders(s_node, u_nodes, s_ips, start_time, stop_time, on_off_rate):
+def assign_ip(s_devices, d_star, u_star, pool, pool_prefix):
+    # Every link gets its own /30 from the pool, enough for millions of clients
+    address = addressing.SubnetAllocator(pool, pool_prefix)
+    s_addr = address.assign("server", s_devices)
+    d_star.assign(address, "downloaders")
+    u_star.assign(address, "uploaders")
+    return s_addr
+
+def setup_routing(s_node, s_devices, s_ips, d_star, u_star, mode):
+    if mode == routing.GLOBAL:
+        routing.populate_global()
+        return
+    # The second server node is directly connected to every network, all
+    # other nodes only need a default route to it
+    routing.route_star(d_star)
+    routing.route_star(u_star)
+    routing.default_route(s_node.Get(0), s_devices.Get(0), s_ips.GetAddress(1))
+
+def setup_downloaders(s_node, d_star, start_time, stop_time, on_off_rate, sinks):
+    # The server sends to every downloader, one helper for all of them
+    for i in range(0, len(d_star)):
+        sinks.get(d_star.leaf(i))
+    downloads = traffic.TrafficClass(on_off_rate)
+    downloads.install_to(s_node.Get(0), [d_star.address(i, topology.HUB) for i in range(0, len(d_star))],
+        ns.core.Seconds(start_time), ns.core.Seconds(stop_time))
+
+def setup_uploaders(s_node, u_star, s_ips, start_time, stop_time, on_off_rate, sinks):
+    # All uploaders send to the server, installed in one call
+    if len(u_star):
+        sinks.get(s_node.Get(0))
+    uploads = traffic.TrafficClass(on_off_rate)
+    uploads.install(u_star.leaves, s_ips.GetAddress(1),
+        ns.core.Seconds(start_time), ns.core.Seconds(stop_time))
+
+def trace_senders(s_node, u_nodes, d_start_time, u_start_time):
+    trace = tcptrace.TcpTrace()
+    # The server sends to all downloaders, connect to all of its sockets
+    trace.connect_at(d_start_time, s_node.Get(0).GetId(), "*")
     for i in range(0, u_nodes.GetN()):
-        node = u_nodes.Get(i)
-        server = s_node.Get(0)
-        setup_tcp_connection(node, server, s_ips.GetAddress(1), ns.core.Seconds(start_time), ns.core.Seconds(stop_time), on_off_rate)
+        trace.connect_at(u_start_time, u_nodes.Get(i).GetId())
+    return trace
 
 def create_pcap():
     pass
@@ -208,32 +191,37 @@ def flowmon_analysis(monitor, flowmon_helper):
         #print("timeFirstTxPacket: " + str(flow_stats.timeFirstTxPacket.GetSeconds()))
 
 def sim(downloaders, uploaders, cmd):
+    seeding.seed_rng(int(cmd.seed), int(cmd.run))
     s_node, d_nodes, u_nodes = create_nodes(downloaders, uploaders)
-    s_link, d_links, u_links = link_nodes(
-        s_node, d_nodes, u_nodes, int(cmd.queue_length)
-    )
-    s_devices, d_devices, u_devices = install_network_devices(
-        s_link, int(cmd.s_data_rate), int(cmd.s_latency),
-        d_links, int(cmd.d_data_rate), int(cmd.d_latency),
-        u_links, int(cmd.u_data_rate), int(cmd.u_latency)
+    s_devices, d_star, u_star = install_network_devices(
+        s_node, int(cmd.s_data_rate), int(cmd.s_latency),
+        d_nodes, int(cmd.d_data_rate), int(cmd.d_latency),
+        u_nodes, int(cmd.u_data_rate), int(cmd.u_latency),
+        int(cmd.queue_length)
     )
 
-    set_error_model(s_devices, float(cmd.error_rate))
+    if int(cmd.pcap):
+        capture.configure(int(cmd.pcap_snaplen))
+        capture.enable("sim4", [s_devices.Get(0)])
+    em = set_error_model(s_devices, float(cmd.error_rate))
 
     configure_tcp()
-    stack = create_protocol_stack(s_node, d_nodes, u_nodes)
-    s_ips, d_ips, u_ips = assign_ip(
-        s_devices, "1.x.x.0", "255.255.255.0",
-        d_devices, "2.x.x.0", "255.255.255.0",
-        u_devices, "3.x.x.0", "255.255.255.0"
-    )
-    ns.internet.Ipv4GlobalRoutingHelper.PopulateRoutingTables()
-    setup_downloaders(s_node, d_nodes, d_ips, float(cmd.d_start_time), float(cmd.d_stop_time), int(cmd.d_on_off))    # start time 2 and stop time 40 and on off rate 300000
-    setup_uploaders(s_node, u_nodes, s_ips, float(cmd.u_start_time), float(cmd.u_stop_time), int(cmd.u_on_off))    # start time 2 and stop time 40 and on off rate 300000
+    create_protocol_stack(s_node, d_nodes, u_nodes)
+    s_ips = assign_ip(s_devices, d_star, u_star, str(cmd.address_pool), int(cmd.address_pool_prefix))
+    setup_routing(s_node, s_devices, s_ips, d_star, u_star, str(cmd.routing))
+    sinks = packet_sinks.Sinks(2.0, 50.0)
+    setup_downloaders(s_node, d_star, float(cmd.d_start_time), float(cmd.d_stop_time), int(cmd.d_on_off), sinks)    # start time 2 and stop time 40 and on off rate 300000
+    setup_uploaders(s_node, u_star, s_ips, float(cmd.u_start_time), float(cmd.u_stop_time), int(cmd.u_on_off), sinks)    # start time 2 and stop time 40 and on off rate 300000
+    seeding.assign_streams(ns.network.NodeContainer(s_node, d_nodes, u_nodes), em)
+    trace = None
+    if cmd.trace:
+        trace = trace_senders(s_node, u_nodes, float(cmd.d_start_time), float(cmd.u_start_time))
     monitor, helper = create_flowmon()
     ns.core.Simulator.Stop(ns.core.Seconds(float(cmd.sim_run_time)))
     ns.core.Simulator.Run()
     flowmon_analysis(monitor, helper)
+    if trace is not None:
+        trace.save(cmd.trace)
     ns.core.Simulator.Destroy()
 
 
@@ -8,15 +8,41 @@ import ns.network
 import ns.point_to_point
 import ns.flow_monitor
 import time
-import random
+import glob
 import matplotlib.pyplot as plt
-
-def seed_rng():
-    #ns.core.RngSeedManager.SetSeed(int(time.time() * 1000 % (2**31-1)))
-    ns.core.RngSeedManager.SetSeed(random.randint(0, sys.maxint))
-    #print(str(int(time.time() * 1000 % (2**31-1))))
-    #print(str(random.randint(0, sys.maxint)))
-    #sys.exit()
+import numpy as np
+import sweep
+import cache
+import results
+import stats
+import checkpoint
+import seeding
+import capture
+import pcap_archive
+import queue_model
+import topology
+import addressing
+import routing
+import packet_sinks
+import traffic
+
+# Options that make up a scenario, these are handed to the sweep workers
+OPTIONS = ("queue_length", "d_max", "u_min", "u_step", "u_max", "latency",
+           "rate", "error_rate", "attempts", "on_off_rate", "seed",
+           "pcap", "pcap_devices", "pcap_snaplen", "pcap_max_mb", "pcap_archive",
+           "routing")
+
+# Options that change the result of a single run. The sweep range options are
+# left out so that extending a sweep doesn't invalidate cached runs, and so is
+# routing, both modes give the same routes.
+SCENARIO_OPTIONS = ("queue_length", "latency", "rate", "error_rate", "on_off_rate", "seed")
+
+# Bump this when sim() changes in a way that makes cached results invalid
+SIM_VERSION = 8
+
+TCP_SEGMENT_SIZE = 1448
+TCP_RETX_THRESHOLD = 4
+TCP_WESTWOOD_PROTOCOL = "WestwoodPlus"
 
 def command_line():
     cmd = ns.core.CommandLine()
@@ -31,39 +57,66 @@ def command_line():
     cmd.rate = 500000
     cmd.error_rate = 0.2
     cmd.attempts = 20
+    cmd.precision = 0.0     # target relative CI half width, 0 runs exactly attempts runs
+    cmd.min_attempts = 5
+    cmd.max_attempts = 100
+    cmd.pcap = 0            # capture packets (0 or 1)
+    cmd.pcap_devices = "d2d3.1"
+    cmd.pcap_snaplen = 0    # bytes captured per packet, 0 for whole packets
+    cmd.pcap_max_mb = 0     # size limit of the pcap directory, 0 for no limit
+    cmd.pcap_archive = 0    # compress captures into indexed archives after each run
+    cmd.compare = ""        # option:value_a:value_b, compare two configurations
+    cmd.prescreen = 0       # only simulate the points where the queue model predicts loss starting
+    cmd.queue_model = "md1k"    # mm1k or md1k
+    cmd.loss_low = 0.001    # predicted loss range worth simulating
+    cmd.loss_high = 0.5
+    cmd.routing = routing.GLOBAL    # global or static routes
+    cmd.workers = 0     # worker processes, 0 means one per cpu
+    cmd.seed = seeding.BASE_SEED
+    cmd.cache = 1       # reuse results of earlier runs
+    cmd.cache_dir = cache.DEFAULT_DIR
+    cmd.cache_size = 100    # cache size limit in MB
+    cmd.results_dir = results.DEFAULT_DIR
+    cmd.checkpoint = "sim5.checkpoint"
 
     cmd.on_off_rate = 300000 #300000
     cmd.AddValue ("rate", "P2P data rate in bps")
     cmd.AddValue ("latency", "P2P link Latency in miliseconds")
     cmd.AddValue ("on_off_rate", "OnOffApplication data sending rate")
+    cmd.AddValue ("attempts", "Runs per sweep point")
+    cmd.AddValue ("precision", "Run until the 95% CI half width is below this fraction of the mean")
+    cmd.AddValue ("min_attempts", "Runs per sweep point before checking the precision")
+    cmd.AddValue ("max_attempts", "Maximum runs per sweep point when a precision is set")
+    cmd.AddValue ("pcap", "Capture packets to pcap files (0 or 1)")
+    cmd.AddValue ("pcap_devices", "Devices to capture on, e.g. d2d3.1,d1d2.0")
+    cmd.AddValue ("pcap_snaplen", "Bytes captured per packet, 0 captures whole packets")
+    cmd.AddValue ("pcap_max_mb", "Size limit of the pcap directory in MB, oldest files are removed")
+    cmd.AddValue ("pcap_archive", "Replace captures with compressed, time indexed archives (0 or 1)")
+    cmd.AddValue ("compare", "Paired comparison of two values of an option, as option:a:b")
+    cmd.AddValue ("prescreen", "Skip points the queue model predicts outside loss_low..loss_high (0 or 1)")
+    cmd.AddValue ("queue_model", "Queue model used for the prescreen, mm1k or md1k")
+    cmd.AddValue ("loss_low", "Lowest predicted loss probability worth simulating")
+    cmd.AddValue ("loss_high", "Highest predicted loss probability worth simulating")
+    cmd.AddValue ("routing", "global (shortest paths over the whole graph) or static (default routes)")
+    cmd.AddValue ("workers", "Number of simulations to run in parallel")
+    cmd.AddValue ("seed", "Base seed, runs get their own run number")
+    cmd.AddValue ("cache", "Use the result cache (0 or 1)")
+    cmd.AddValue ("cache_dir", "Result cache directory")
+    cmd.AddValue ("cache_size", "Result cache size limit in MB")
+    cmd.AddValue ("results_dir", "Directory to write the sweep results to")
+    cmd.AddValue ("checkpoint", "Checkpoint file to resume an interrupted sweep from")
     cmd.Parse(sys.argv)
     return cmd
 
-def create_nodes(no_of_downloaders, no_of_uploaders):
+def create_nodes():
+    # Server (0), router (1) and the hub (2) the clients are connected to. The
+    # clients are created with the star in install_devices.
     nodes = ns.network.NodeContainer()
-    nodes.Create(3 + no_of_downloaders + no_of_uploaders)
+    nodes.Create(3)
     return nodes
 
-def connect_nodes(nodes, queue_length):
+def install_devices(nodes, no_of_clients, queue_length, data_rate, latency):
     ns.core.Config.SetDefault("ns3::DropTailQueue::MaxPackets", ns.core.UintegerValue(queue_length))
-    links = dict()
-
-    links["n0n1"] = ns.network.NodeContainer()
-    links["n0n1"].Add(nodes.Get(0))
-    links["n0n1"].Add(nodes.Get(1))
-
-    links["n1n2"] = ns.network.NodeContainer()
-    links["n1n2"].Add(nodes.Get(1))
-    links["n1n2"].Add(nodes.Get(2))
-
-    for i in range(3, nodes.GetN()):
-        s = "n2n" + str(i)
-        links[s] = ns.network.NodeContainer()
-        links[s].Add(nodes.Get(2))
-        links[s].Add(nodes.Get(i))
-    return links
-
-def install_devices(links, data_rate, latency):
     # create point-to-point helper with common attributes
     pointToPoint = ns.point_to_point.PointToPointHelper()
     pointToPoint.SetDeviceAttribute("Mtu", ns.core.UintegerValue(1500))
@@ -72,24 +125,44 @@ def install_devices(links, data_rate, latency):
     pointToPoint.SetChannelAttribute("Delay",
                                 ns.core.TimeValue(ns.core.MilliSeconds(latency)))
     devices = dict()
-
-    #devices["d0d1"] = pointToPoint.Install(links["n0n1"])
-    #devices["d1d2"] = pointToPoint.Install(links["n1n2"])
-    for k, v in links.items():
-        s = k.replace("n", "d")
-        devices[s] = pointToPoint.Install(v)
-    pointToPoint.EnablePcap("pcap/sim5-uploaders-" + str(len(links) - 3), devices["d2d3"].Get(1), True)
-    return devices
+    devices["d0d1"] = pointToPoint.Install(nodes.Get(0), nodes.Get(1))
+    devices["d1d2"] = pointToPoint.Install(nodes.Get(1), nodes.Get(2))
+    # Client i is node 3 + i, downloaders first
+    star = topology.create_star(nodes.Get(2), no_of_clients, pointToPoint)
+    return devices, star
+
+def get_device(devices, star, key, side):
+    # Device of a link named by its nodes, e.g. "d1d2", the links of the
+    # clients are "d2d3" and up
+    if key in devices:
+        return devices[key].Get(side)
+    return star.device(int(key[len("d2d"):]) - 3, side)
+
+def enable_pcap(devices, star, cmd, no_of_uploaders, replication):
+    # pcap_devices is a comma separated list of link device pairs and the side
+    # of the link to capture on, e.g. "d2d3.1,d1d2.0"
+    capture.configure(int(cmd.pcap_snaplen))
+    selected = list()
+    for spec in str(cmd.pcap_devices).split(","):
+        key, side = spec.strip().split(".")
+        selected.append(get_device(devices, star, key, int(side)))
+    # pcap_tag tells apart the configurations of a --compare run, which share
+    # uploaders and run numbers
+    prefix = "%s/sim5-uploaders-%i-run-%i%s" % (capture.DEFAULT_DIR, no_of_uploaders,
+                                               replication, cmd.pcap_tag)
+    capture.enable(prefix, selected)
+    return prefix
 
 def set_error_model(devices, rate):
     em = ns.network.RateErrorModel()
     em.SetAttribute("ErrorUnit", ns.core.StringValue("ERROR_UNIT_PACKET"))
     em.SetAttribute("ErrorRate", ns.core.DoubleValue(rate))
     devices["d1d2"].Get(1).SetReceiveErrorModel(em)
+    return em
 
 def configure_tcp():
     # Set a TCP segment size (this should be inline with the channel MTU)
-    ns.core.Config.SetDefault("ns3::TcpSocket::SegmentSize", ns.core.UintegerValue(1448))
+    ns.core.Config.SetDefault("ns3::TcpSocket::SegmentSize", ns.core.UintegerValue(TCP_SEGMENT_SIZE))
 
     # If you want, you may set a default TCP version here. It will affect all TCP
     # connections created in the simulator. If you want to simulate different TCP versions
@@ -101,101 +174,60 @@ def configure_tcp():
     #                          ns.core.StringValue("ns3::TcpWestwood"))
 
     # Some examples of attributes for some of the TCP versions.
-    ns.core.Config.SetDefault("ns3::TcpNewReno::ReTxThreshold", ns.core.UintegerValue(4))
+    ns.core.Config.SetDefault("ns3::TcpNewReno::ReTxThreshold", ns.core.UintegerValue(TCP_RETX_THRESHOLD))
     ns.core.Config.SetDefault("ns3::TcpWestwood::ProtocolType",
-                              ns.core.StringValue("WestwoodPlus"))
+                              ns.core.StringValue(TCP_WESTWOOD_PROTOCOL))
 
 def create_protocol_stack(nodes):
     stack = ns.internet.InternetStackHelper()
     stack.Install(nodes)
 
-def assign_ip(devices):
-    helper = ns.internet.Ipv4AddressHelper()
+def assign_ip(devices, star):
+    # Every link gets its own /30 from 10.0.0.0/8
+    allocator = addressing.SubnetAllocator()
     address = dict()
-    i = 0
-    for k, v in devices.items():
-        s = k.replace("d", "if")
-        ip = "x.x.x.0"
-        x1 = 16711680
-        x2 = 65280
-        x3 = 255
-        ip = ip.replace("x", str((i & x1) >> 16), 1)
-        ip = ip.replace("x", str((i & x2) >> 8), 1)
-        ip = ip.replace("x", str((i & x3)), 1)
-        #print(ip)
-        helper.SetBase(ns.network.Ipv4Address(ip), ns.network.Ipv4Mask("255.255.255.0"))
-        address[s] = helper.Assign(v)
-        i += 1
-    ns.internet.Ipv4GlobalRoutingHelper.PopulateRoutingTables()
+    for k in ("d0d1", "d1d2"):
+        address[k.replace("d", "if")] = allocator.assign(k, devices[k])
+    star.assign(allocator, "clients")
     return address
 
-def setup_tcp_connection(src_node, dst_node, dst_addr, start_time, stop_time, on_off_rate):
-    packet_sink_helper = ns.applications.PacketSinkHelper(
-        "ns3::TcpSocketFactory",
-        ns.network.InetSocketAddress(
-            ns.network.Ipv4Address.GetAny(),
-            8080
-        )
-    )
-
-    sink_apps = packet_sink_helper.Install(dst_node)
-    sink_apps.Start(ns.core.Seconds(2.0))
-    sink_apps.Stop(ns.core.Seconds(50.0))
-
-    on_off_tcp_helper = ns.applications.OnOffHelper(
-        "ns3::TcpSocketFactory",
-        ns.network.Address(
-            ns.network.InetSocketAddress(dst_addr, 8080)
-        )
+def setup_routing(nodes, devices, star, address, mode):
+    if mode == routing.GLOBAL:
+        routing.populate_global()
+        return
+    # The clients go to the hub, the hub (2) and the server (0) to the router
+    # (1), and the router to the clients through the hub
+    routing.route_star(star)
+    routing.default_route(nodes.Get(2), devices["d1d2"].Get(1), address["if1if2"].GetAddress(0))
+    routing.default_route(nodes.Get(0), devices["d0d1"].Get(0), address["if0if1"].GetAddress(1))
+    routing.kind_routes(nodes.Get(1), devices["d1d2"].Get(0), address["if1if2"].GetAddress(1),
+                        star.allocator, "clients")
+
+def setup_tcp(nodes, star, address, no_of_downloaders, no_of_uploaders, on_off_rate):
+    # One sink per destination node and one OnOff helper for all clients
+    sinks = packet_sinks.Sinks(2.0, 50.0)
+    clients = traffic.TrafficClass(on_off_rate, traffic.EXPONENTIAL_ON, traffic.EXPONENTIAL_OFF)
+    start_time = ns.core.Seconds(2.0)
+    stop_time = ns.core.Seconds(40.0)
+    # The server sends to every downloader
+    for i in range(0, no_of_downloaders):
+        sinks.get(star.leaf(i))
+    clients.install_to(
+        nodes.Get(0),
+        [star.address(i, topology.LEAF) for i in range(0, no_of_downloaders)],
+        start_time,
+        stop_time
     )
-    on_off_tcp_helper.SetAttribute(
-        "DataRate",
-        ns.network.DataRateValue(
-            ns.network.DataRate(on_off_rate)
-        )
-    )
-    on_off_tcp_helper.SetAttribute(
-        "PacketSize",
-        ns.core.UintegerValue(1500)
-    )
-    on_off_tcp_helper.SetAttribute(
-        "OnTime",
-        #ns.core.StringValue("ns3::ConstantRandomVariable[Constant=2]")
-        ns.core.StringValue("ns3::ExponentialRandomVariable[Mean=2]")
-    )
-    on_off_tcp_helper.SetAttribute(
-        "OffTime",
-        #ns.core.StringValue("ns3::ConstantRandomVariable[Constant=1]")
-        #ns.core.StringValue("ns3::UniformRandomVariable[Min=1,Max=2]")
-        ns.core.StringValue("ns3::ExponentialRandomVariable[Mean=1]")
-        )
-
-
-    client_apps = on_off_tcp_helper.Install(src_node)
-    client_apps.Start(start_time)
-    client_apps.Stop(stop_time)
-
-def setup_tcp(nodes, address, no_of_downloaders, no_of_uploaders, on_off_rate):
-    for i in range(3, 3 + no_of_downloaders):
-        ip = "if2if" + str(i)
-        setup_tcp_connection(
-            nodes.Get(0),
-            nodes.Get(i),
-            address[ip].GetAddress(1),
-            ns.core.Seconds(2.0),
-            ns.core.Seconds(40.0),
-            on_off_rate
-        )
-    for i in range(3 + no_of_downloaders, 3 + no_of_downloaders + no_of_uploaders):
-        ip = "if0if1"
-        setup_tcp_connection(
-            nodes.Get(i),
-            nodes.Get(0),
-            address[ip].GetAddress(0),
-            ns.core.Seconds(2.0),
-            ns.core.Seconds(40.0),
-            on_off_rate
+    # The uploaders all send to the server
+    if no_of_uploaders:
+        sinks.get(nodes.Get(0))
+        clients.install(
+            star.leaf_range(no_of_downloaders, no_of_downloaders + no_of_uploaders),
+            address["if0if1"].GetAddress(0),
+            start_time,
+            stop_time
         )
+    return sinks
 
 
 
@@ -208,6 +240,16 @@ def run(seconds):
     ns.core.Simulator.Stop(ns.core.Seconds(seconds))
     ns.core.Simulator.Run()
 
+def flow_result(flow_stats):
+    return {
+        "throughput": get_throughput(flow_stats),
+        "packet_loss": flow_stats.lostPackets,
+        "tx_bytes": flow_stats.txBytes,
+        "rx_bytes": flow_stats.rxBytes,
+        "first_tx": flow_stats.timeFirstTxPacket.GetSeconds(),
+        "last_rx": flow_stats.timeLastRxPacket.GetSeconds(),
+    }
+
 def get_throughput(flow_stats):
     return (flow_stats.rxBytes *
                                        8.0 /
@@ -239,7 +281,7 @@ def analyse(monitor, flowmon_helper):
                                          1024/
                                          1024))
 
-def analyse_downloader(monitor, flowmon_helper, address):
+def analyse_downloader(monitor, flowmon_helper, star):
     monitor.CheckForLostPackets()
     classifier = flowmon_helper.GetClassifier()
     data = dict()
@@ -247,28 +289,24 @@ def analyse_downloader(monitor, flowmon_helper, address):
 
     for flow_id, flow_stats in monitor.GetFlowStats():
         t = classifier.FindFlow(flow_id)
-        #print(address["if2if3"].GetAddress(1))
-        downloader = get_downloader_addr(address)
+        downloader = get_downloader_addr(star)
         if downloader == t.sourceAddress:   #acks
-            ack["throughput"] = get_throughput(flow_stats)
-            ack["packet_loss"] = flow_stats.lostPackets
+            ack = flow_result(flow_stats)
 
-        elif get_downloader_addr(address) == t.destinationAddress:  #data
-            data["throughput"] = get_throughput(flow_stats)
-            data["packet_loss"] = flow_stats.lostPackets
+        elif downloader == t.destinationAddress:  #data
+            data = flow_result(flow_stats)
         #print(t.sourceAddress)
     return data, ack
 
 
-def get_downloader_addr(address):
-    return address["if2if3"].GetAddress(1)
+def get_downloader_addr(star):
+    return star.address(0, topology.LEAF)
 
 def get_server_addr(address):
     return address["if0if1"].GetAddress(0)
 
-def get_uploader_addr(address, no_of_downloaders):
-    key = "if2if" + str(3 + no_of_downloaders)
-    return address[key].GetAddress(1)
+def get_uploader_addr(star, no_of_downloaders):
+    return star.address(no_of_downloaders, topology.LEAF)
 
 def destroy():
     ns.core.Simulator.Destroy()
@@ -277,23 +315,138 @@ def print_result(result):
     print("Throughput:  %f Mbps" % result["throughput"])
     print("Packet loss: %i" % result["packet_loss"])
 
-def sim(no_of_downloaders, no_of_uploaders, cmd):
-    seed_rng()
-    nodes = create_nodes(no_of_downloaders, no_of_uploaders)
-    links = connect_nodes(nodes, int(cmd.queue_length))
-    devices = install_devices(links, int(cmd.rate), int(cmd.latency))
-    set_error_model(devices, float(cmd.error_rate))
+def sim(no_of_downloaders, no_of_uploaders, replication, cmd):
+    seed = int(cmd.seed)
+    rng_run = seeding.run_number(no_of_downloaders, no_of_uploaders, replication)
+    seeding.seed_rng(seed, rng_run)
+    nodes = create_nodes()
+    devices, star = install_devices(nodes, no_of_downloaders + no_of_uploaders,
+                                    int(cmd.queue_length), int(cmd.rate), int(cmd.latency))
+    all_nodes = ns.network.NodeContainer(nodes, star.leaves)
+    if int(cmd.pcap):
+        pcap_prefix = enable_pcap(devices, star, cmd, no_of_uploaders, replication)
+    em = set_error_model(devices, float(cmd.error_rate))
     configure_tcp()
-    create_protocol_stack(nodes)
-    address = assign_ip(devices)
-    setup_tcp(nodes, address, no_of_downloaders, no_of_uploaders, int(cmd.on_off_rate))
+    create_protocol_stack(all_nodes)
+    address = assign_ip(devices, star)
+    setup_routing(nodes, devices, star, address, str(cmd.routing))
+    setup_tcp(nodes, star, address, no_of_downloaders, no_of_uploaders, int(cmd.on_off_rate))
+    seeding.assign_streams(all_nodes, em)
     monitor, flowmon_helper = create_flow_monitor()
     run(50.0)
     #analyse(monitor, flowmon_helper)
-    data, ack = analyse_downloader(monitor, flowmon_helper, address)
+    data, ack = analyse_downloader(monitor, flowmon_helper, star)
     destroy()
+    if int(cmd.pcap):
+        if int(cmd.pcap_archive):
+            for path in glob.glob(pcap_prefix + "-*.pcap"):
+                pcap_archive.archive_and_remove(path)
+        capture.rotate(capture.DEFAULT_DIR, int(cmd.pcap_max_mb) * 1024 * 1024)
+    data["seed"] = seed
+    data["rng_run"] = rng_run
+    ack["seed"] = seed
+    ack["rng_run"] = rng_run
     return data, ack
 
+def sim_job(no_of_downloaders, no_of_uploaders, replication, values):
+    return sim(no_of_downloaders, no_of_uploaders, replication, sweep.Params(values))
+
+def scenario(no_of_downloaders, no_of_uploaders, run, values):
+    # Everything that affects the outcome of one sim() run, used as cache key
+    key = {
+        "sim": "sim5",
+        "version": SIM_VERSION,
+        "downloaders": no_of_downloaders,
+        "uploaders": no_of_uploaders,
+        "run": run,
+        "tcp_segment_size": TCP_SEGMENT_SIZE,
+        "tcp_retx_threshold": TCP_RETX_THRESHOLD,
+        "tcp_westwood_protocol": TCP_WESTWOOD_PROTOCOL,
+    }
+    for name in SCENARIO_OPTIONS:
+        key[name] = float(values[name])
+    return key
+
+def collect(jobs, journal, result_cache, workers):
+    # Yields (job, result, wall time) for every job. Runs found in the
+    # checkpoint or the cache come first with a wall time of None, the rest
+    # are simulated.
+    missing = list()
+    for job in jobs:
+        key = scenario(*job)
+        result = journal.get(cache.scenario_hash(key))
+        if result is None and result_cache is not None:
+            result = result_cache.get(key)
+        if result is None:
+            missing.append(job)
+        else:
+            yield job, result, None
+    print("%i runs to simulate, %i cached" % (len(missing), len(jobs) - len(missing)))
+    for job, (data, ack), elapsed in sweep.run_jobs(sim_job, missing, workers):
+        key = scenario(*job)
+        result = {"data": data, "ack": ack}
+        journal.record(cache.scenario_hash(key), result)
+        if result_cache is not None:
+            result_cache.put(key, result)
+        yield job, result, elapsed
+
+def compare(cmd, values, journal, result_cache):
+    # Paired comparison of two values of one option, e.g. --compare=queue_length:1:5.
+    # Both configurations run with the same seed and run numbers, so their
+    # random draws are the same and the difference has a small variance.
+    name, a, b = str(cmd.compare).split(":")
+    # Other options don't change a run or its cache key, both sides would
+    # get the same results
+    # seed is one of them but both sides must share it, that's the point
+    options = [option for option in SCENARIO_OPTIONS if option != "seed"]
+    if name not in options:
+        raise ValueError("cannot compare %s, use one of %s" % (name, ", ".join(options)))
+    if a == b:
+        raise ValueError("nothing to compare, both values of %s are %s" % (name, a))
+    configs = (dict(values), dict(values))
+    configs[0][name] = a
+    configs[1][name] = b
+    configs[0]["pcap_tag"] = "-%s-%s" % (name, a)
+    configs[1]["pcap_tag"] = "-%s-%s" % (name, b)
+    points = list(range(0, int(cmd.u_max), int(cmd.u_step)))
+    config_stats = (stats.RunningStats(len(points)), stats.RunningStats(len(points)))
+    diff_stats = stats.RunningStats(len(points))
+    jobs = list()
+    for no_uploaders in points:
+        for i in range(0, int(cmd.attempts)):
+            for config in configs:
+                jobs.append((int(cmd.d_max), no_uploaders, i, config))
+    pending = dict()
+    for job, result, elapsed in collect(jobs, journal, result_cache, int(cmd.workers)):
+        p = points.index(job[1])
+        c = configs.index(job[3])
+        throughput = result["data"]["throughput"]
+        config_stats[c].add(p, throughput)
+        other = pending.pop((p, job[2]), None)
+        if other is None:
+            pending[(p, job[2])] = (c, throughput)
+        else:
+            pair = dict((other, (c, throughput)))
+            diff_stats.add(p, pair[1] - pair[0])
+    for p, no_uploaders in enumerate(points):
+        print("No of uploaders: " + str(no_uploaders))
+        print(" %s=%s throughput: %s" % (name, a, config_stats[0].summary(p)))
+        print(" %s=%s throughput: %s" % (name, b, config_stats[1].summary(p)))
+        print(" Difference (%s - %s): %s" % (b, a, diff_stats.summary(p)))
+
+def prescreen(cmd, points):
+    # Predicts the bottleneck loss for every point and returns the points
+    # worth simulating
+    prediction = queue_model.predict(points, int(cmd.queue_length), int(cmd.rate),
+                                     int(cmd.on_off_rate), str(cmd.queue_model),
+                                     TCP_SEGMENT_SIZE)
+    keep = queue_model.interesting(prediction["loss"], float(cmd.loss_low), float(cmd.loss_high))
+    for p, no_uploaders in enumerate(points):
+        print("Uploaders: %i  load %.2f  predicted loss %.4f  delay %.4fs%s" %
+              (no_uploaders, prediction["load"][p], prediction["loss"][p],
+               prediction["delay"][p], "" if keep[p] else "  (skipped)"))
+    return [u for u, k in zip(points, keep) if k]
+
 def plot(uploaders, througput, packet_loss):
     plt.figure("Throughput")
     plt.plot(uploaders, througput)
@@ -307,65 +460,85 @@ def plot(uploaders, througput, packet_loss):
 
 def main():
     cmd = command_line()
+    routing.check_mode(str(cmd.routing))
+    if int(cmd.min_attempts) > int(cmd.max_attempts):
+        raise ValueError("min_attempts (%s) is larger than max_attempts (%s)"
+                         % (cmd.min_attempts, cmd.max_attempts))
+    values = sweep.cmd_values(cmd, OPTIONS)
+    values["pcap_tag"] = ""
     #data, ack = sim(int(cmd.d_max), int(cmd.u_max), cmd)
     #print_result(data)
     #sys.exit()
     #uploaders = list()
     #th = list()
-    tf = open("througput.r", "a")
-    pf = open("packet_loss.r", "a")
-    throughput_result = list()
-    packet_loss_result = list()
-    uploaders_result = list()
-    for no_uploaders in range(0, int(cmd.u_max), int(cmd.u_step)):
+    result_cache = None
+    if int(cmd.cache):
+        result_cache = cache.ResultCache(str(cmd.cache_dir), int(cmd.cache_size) * 1024 * 1024)
+    journal = checkpoint.Checkpoint(str(cmd.checkpoint))
+    if len(journal):
+        print("Resuming from %s, %i runs done" % (cmd.checkpoint, len(journal)))
+    if str(cmd.compare):
+        compare(cmd, values, journal, result_cache)
+        journal.remove()
+        return
+    points = list(range(0, int(cmd.u_max), int(cmd.u_step)))
+    if int(cmd.prescreen):
+        points = prescreen(cmd, points)
+        if not points:
+            sys.stderr.write("Warning: no point has a predicted loss between %s and %s, "
+                             "nothing to simulate\n" % (cmd.loss_low, cmd.loss_high))
+            journal.remove()
+            return
+    throughput_stats = stats.RunningStats(len(points))
+    packet_loss_stats = stats.RunningStats(len(points))
+    point_results = [dict() for p in points]
+    precision = float(cmd.precision)
+    if precision > 0:
+        # Sequential sampling, every point starts with min_attempts runs
+        todo = [int(cmd.min_attempts)] * len(points)
+    else:
+        todo = [int(cmd.attempts)] * len(points)
+    while sum(todo) > 0:
+        jobs = list()
+        for p, no_uploaders in enumerate(points):
+            first = len(point_results[p])
+            for i in range(first, first + todo[p]):
+                jobs.append((int(cmd.d_max), no_uploaders, i, values))
+        for job, result, elapsed in collect(jobs, journal, result_cache, int(cmd.workers)):
+            p = points.index(job[1])
+            data = result["data"]
+            point_results[p][job[2]] = data
+            throughput_stats.add(p, data["throughput"])
+            packet_loss_stats.add(p, data["packet_loss"])
+            if elapsed is not None:
+                print("Uploaders: %i  run %i  %.2fs  throughput %s" %
+                      (job[1], job[2], elapsed, throughput_stats.summary(p)))
+        if precision <= 0:
+            break
+        # Next round, at most double the number of runs of the noisy points
+        need = stats.runs_needed(throughput_stats, precision,
+                                 int(cmd.min_attempts), int(cmd.max_attempts))
+        todo = [int(x) for x in np.minimum(need, throughput_stats.n)]
+    rows = list()
+    for p, no_uploaders in enumerate(points):
         #data, ack = sim(int(cmd.d_max), no_uploaders, cmd)
         #print_result(data)
-        result_data = list()
-        for i in range(0,int(cmd.attempts)):
-            data, ack = sim(int(cmd.d_max), no_uploaders, cmd)
-            result_data.append(data)
-        throughput = 0.0
-        packet_loss = 0.0
-        tf.write("u_" + str(no_uploaders) + " = c(")
-        pf.write("u_" + str(no_uploaders) + " = c(")
-        for i in range(0, len(result_data)):
-            throughput += result_data[i]["throughput"]
-            tf.write(str(result_data[i]["throughput"]) + ", ")
-            packet_loss += result_data[i]["packet_loss"]
-            pf.write(str(result_data[i]["packet_loss"]) + ", ")
-        tf.write(")\n")
-        pf.write(")\n")
-        tf.write("mean_" + str(no_uploaders) + " = mean(u_" + str(no_uploaders) + ")\n")
-        pf.write("mean_" + str(no_uploaders) + " = mean(u_" + str(no_uploaders) + ")\n")
-        tf.write("sd_" + str(no_uploaders) + " = sd(u_" + str(no_uploaders) + ")\n")
-        pf.write("sd_" + str(no_uploaders) + " = sd(u_" + str(no_uploaders) + ")\n")
-        attempts = int(cmd.attempts)
-        #confidence level 0.95
-        tf.write("ce_" + str(no_uploaders) + " = (sd_" + str(no_uploaders) + " / sqrt(" + str(attempts) + ")) * 1.96\n")
-        tf.write("print(\"mean_" + str(no_uploaders) + "\")\n")
-        tf.write("print(mean_" + str(no_uploaders) + ")\n")
-        tf.write("print(\"ce_" + str(no_uploaders) + "\")\n")
-        tf.write("print(ce_" + str(no_uploaders) + ")\n")
-        tf.write("print(\"---------------------------\")\n")
-        pf.write("ce_" + str(no_uploaders) + " = (sd_" + str(no_uploaders) + " / sqrt(" + str(attempts) + ")) * 1.96\n")
-        pf.write("print(\"mean_" + str(no_uploaders) + "\")\n")
-        pf.write("print(mean_" + str(no_uploaders) + ")\n")
-        pf.write("print(\"ce_" + str(no_uploaders) + "\")\n")
-        pf.write("print(ce_" + str(no_uploaders) + ")\n")
-        pf.write("print(\"---------------------------\")\n")
+        result_data = point_results[p]
+        for i in sorted(result_data):
+            row = dict(result_data[i])
+            row.update(scenario(int(cmd.d_max), no_uploaders, i, values))
+            rows.append(row)
         print("No of uploaders: " + str(no_uploaders))
-        print(" Avg throughput:  " + str(throughput / len(result_data)))
-        print(" Avg packet loss: " + str(packet_loss / len(result_data)))
-        #result = {
-        #    "uploaders": no_uploaders,
-        #    "throughput": throughput / len(result_data),
-        #    "packet_loss": packet_loss / len(result_data)
-        #}
-        throughput_result.append(throughput / len(result_data))
-        packet_loss_result.append(packet_loss / len(result_data))
-        uploaders_result.append(no_uploaders)
-    tf.close()
-    pf.close()
+        print(" Throughput:  " + throughput_stats.summary(p))
+        print(" Packet loss: " + packet_loss_stats.summary(p))
+    throughput_result = list(throughput_stats.mean)
+    packet_loss_result = list(packet_loss_stats.mean)
+    uploaders_result = points
+    path = results.new_path("sim5", str(cmd.results_dir))
+    results.save(path, rows)
+    print("Results written to " + path)
+    journal.remove()
     plot(uploaders_result, throughput_result, packet_loss_result)
 
-main()
+if __name__ == "__main__":
+    main()
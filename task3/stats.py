@@ -0,0 +1,79 @@
+#!/usr/bin/python
+#
+# Streaming statistics for sweep replications.
+#
+# RunningStats keeps count, mean and sum of squared deviations (Welford) for
+# every point of a sweep in NumPy arrays, so the summary of all points is
+# available at any time without keeping the individual results around.
+
+import numpy as np
+
+# Two sided 95% quantiles of Student's t distribution for 1 to 30 degrees of
+# freedom
+T_975 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+Z_975 = 1.959964
+
+
+def t_quantile(df):
+    # 97.5% quantile of the t distribution, df may be an array. Above 30
+    # degrees of freedom the Cornish-Fisher expansion is used.
+    df = np.asarray(df, dtype=float)
+    z = Z_975
+    with np.errstate(divide="ignore"):
+        q = z + (z**3 + z) / (4 * df) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+    table = np.array((np.inf,) + T_975)
+    small = (df >= 1) & (df <= len(T_975))
+    q = np.where(small, table[np.clip(df, 0, len(T_975)).astype(int)], q)
+    return np.where(df < 1, np.inf, q)
+
+
+class RunningStats(object):
+    def __init__(self, points):
+        self.n = np.zeros(points, dtype=np.int64)
+        self.mean = np.zeros(points)
+        self.m2 = np.zeros(points)
+
+    def add(self, point, value):
+        # point and value may be arrays, in which case the points must be
+        # unique
+        point = np.asarray(point)
+        value = np.asarray(value, dtype=float)
+        self.n[point] += 1
+        delta = value - self.mean[point]
+        self.mean[point] += delta / self.n[point]
+        self.m2[point] += delta * (value - self.mean[point])
+
+    def var(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    def sd(self):
+        return np.sqrt(self.var())
+
+    def ci(self):
+        # Half width of the 95% confidence interval of the mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return t_quantile(self.n - 1) * self.sd() / np.sqrt(self.n)
+
+    def summary(self, point):
+        return "mean %f  sd %f  ci %f  (n=%i)" % (
+            self.mean[point], self.sd()[point], self.ci()[point], self.n[point])
+
+
+def runs_needed(stats, precision, min_runs, max_runs):
+    # Number of extra runs every point needs before the CI half width is at
+    # most precision times the mean, estimated from the variance seen so far.
+    # Points never get more than max_runs runs in total. A point needs two
+    # runs before it has a variance, so it gets at least two whatever min_runs
+    # is.
+    n = stats.n
+    min_runs = max(min_runs, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = precision * np.abs(stats.mean)
+        need = np.ceil((t_quantile(np.maximum(n - 1, 1)) * stats.sd() / target) ** 2)
+    need = np.where(np.isnan(need), n, need)
+    need = np.where(n < min_runs, min_runs, need)
+    need = np.clip(need, n, max_runs).astype(np.int64)
+    return np.maximum(need - n, 0)
@@ -0,0 +1,59 @@
+#!/usr/bin/python
+#
+# Parallel executor for parameter sweeps.
+#
+# Every job is run in a worker process of its own pool, so each worker has its
+# own ns-3 Simulator. Results are handed back in the same order as the jobs
+# together with the wall time each job took.
+
+import multiprocessing
+import time
+
+
+class Params(object):
+    # Plain, picklable stand-in for ns.core.CommandLine, which can't be sent
+    # to the worker processes.
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def values(self):
+        return dict(self.__dict__)
+
+
+def cmd_values(cmd, names):
+    values = dict()
+    for name in names:
+        values[name] = getattr(cmd, name)
+    return values
+
+
+def _timed_call(args):
+    func, job = args
+    start = time.time()
+    result = func(*job)
+    return result, time.time() - start
+
+
+def run_jobs(func, jobs, workers=None):
+    # Generator yielding (job, result, wall time) for every job, in job order.
+    # func must be a module level function so that it can be pickled.
+    jobs = list(jobs)
+    if workers is None or workers <= 0:
+        workers = multiprocessing.cpu_count()
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            result, elapsed = _timed_call((func, job))
+            yield job, result, elapsed
+        return
+
+    pool = multiprocessing.Pool(min(workers, len(jobs)))
+    try:
+        results = pool.imap(_timed_call, [(func, job) for job in jobs])
+        for job, (result, elapsed) in zip(jobs, results):
+            yield job, result, elapsed
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,112 @@
+#!/usr/bin/python
+#
+# Congestion window and RTT traces recorded straight into arrays.
+#
+# Instead of enabling the TcpNewReno log component and filtering gigabytes of
+# log text, the CongestionWindow and RTT trace sources of the TCP sockets are
+# connected to probes of the ns-3 data collection framework. save() merges the
+# probe output into one array of (time, node, value) records per series and
+# saves the arrays as one .npz file, which is read back with load() (or
+# numpy.load) in one call.
+#
+# Limitation: the pybindgen bindings cannot connect a Python function to a
+# trace source, so the values cannot go straight into arrays. A FileHelper
+# still writes one "time value" text line per trace event (in C++, no Python
+# code runs per event) and save() parses the text back, in bulk with
+# numpy.fromfile. The text round-trip per event remains, it is only smaller
+# than the log text it replaces.
+#
+# TCP sockets only exist once the application using them has started, so the
+# probes are connected by an event scheduled just after the start time.
+
+import os
+import glob
+import shutil
+import tempfile
+import warnings
+import numpy as np
+import ns.core
+import ns.stats
+
+SERIES_DTYPE = np.dtype([("time", "f8"), ("node", "u4"), ("value", "f8")])
+
+# Series recorded by TcpTrace, cwnd in bytes and RTT in seconds, with the
+# probe type and the socket trace source of each
+SERIES = ("cwnd", "rtt")
+PROBES = {
+    "cwnd": ("ns3::Uinteger32Probe", "CongestionWindow"),
+    "rtt": ("ns3::TimeProbe", "RTT"),
+}
+
+# Delay after the application start before connecting to its socket
+CONNECT_DELAY = 0.001
+
+TCP_SOCKET_PATH = "/NodeList/%i/$ns3::TcpL4Protocol/SocketList/%s/"
+
+
+class TcpTrace(object):
+    def __init__(self):
+        # The text files of the probes go to a directory of their own, which
+        # save() removes
+        self.directory = tempfile.mkdtemp(prefix="tcptrace-")
+        self.helpers = list()
+        self.files = dict((name, list()) for name in SERIES)   # series -> [(node, file prefix)]
+
+    def connect(self, node, socket=0):
+        # Connects to a socket that already exists, see connect_at. socket
+        # is the index in the socket list of the node, "*" for all sockets.
+        path = TCP_SOCKET_PATH % (node, socket)
+        for name in SERIES:
+            probe, source = PROBES[name]
+            prefix = os.path.join(self.directory, "%s-%i-%i" % (name, node, len(self.files[name])))
+            helper = ns.stats.FileHelper()
+            helper.ConfigureFile(prefix, ns.stats.FileAggregator.FORMATTED)
+            helper.Set2dFormat("%.9e %.9e")
+            helper.WriteProbe(probe, path + source, "Output")
+            # The probes and files live as long as their helper
+            self.helpers.append(helper)
+            self.files[name].append((node, prefix))
+
+    def connect_at(self, start_time, node, socket=0):
+        # Connects to the socket of an application starting at start_time
+        # (seconds)
+        ns.core.Simulator.Schedule(ns.core.Seconds(start_time + CONNECT_DELAY),
+                                   self.connect, node, socket)
+
+    def series(self, name):
+        # SERIES_DTYPE array of a series, sorted by time. A path with a
+        # wildcard gives one file per matching socket, prefix-<socket>.txt.
+        parts = list()
+        for node, prefix in self.files[name]:
+            for path in glob.glob(prefix + ".txt") + glob.glob(prefix + "-*.txt"):
+                # Sockets whose trace source never fired leave empty files
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    values = np.fromfile(path, sep=" ").reshape(-1, 2)
+                rows = np.zeros(len(values), dtype=SERIES_DTYPE)
+                if len(values):
+                    rows["time"] = values[:, 0]
+                    rows["value"] = values[:, 1]
+                rows["node"] = node
+                parts.append(rows)
+        if not parts:
+            return np.zeros(0, dtype=SERIES_DTYPE)
+        data = np.concatenate(parts)
+        return data[np.argsort(data["time"], kind="mergesort")]
+
+    def save(self, path):
+        # Call after Simulator.Run(), the files are complete by then
+        np.savez(path, **dict((name, self.series(name)) for name in SERIES))
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def load(path):
+    # Returns a dict of SERIES_DTYPE arrays, one per series
+    data = np.load(path)
+    return dict((name, data[name]) for name in data.files)
+
+
+def node_series(series, node):
+    # Times and values of one node in a series
+    rows = series[series["node"] == node]
+    return rows["time"], rows["value"]
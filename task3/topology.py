@@ -0,0 +1,81 @@
+#!/usr/bin/python
+#
+# Bulk builder for star (hub and spoke) topologies.
+#
+# All leaves live in one NodeContainer and are linked to the hub with one
+# PointToPointHelper, without a NodeContainer per link or string keyed dicts.
+# The devices of all links are kept in one NetDeviceContainer, ordered by link
+# with the hub side first, so link i is index i of the leaves and indices 2i
+# (hub) and 2i + 1 (leaf) of the devices. assign() gives the links subnets
+# from an addressing.SubnetAllocator, which also looks up their addresses.
+#
+# The helper attributes (rate, delay) in effect when the Star is created are
+# used for all its links, create one Star per class of leaves to use
+# different attributes.
+#
+# The links are installed by a Python loop, one PointToPointHelper.Install()
+# per leaf. ns-3's PointToPointStarHelper does the loop in C++, but it creates
+# its own hub, so the downloader and uploader stars of sim3 and sim4 couldn't
+# share one, and it doesn't give access to the devices. Creating the devices
+# and channels is most of the cost anyway. bench_topology.py times both ways
+# of building a star.
+
+import ns.core
+import ns.network
+
+HUB = 0
+LEAF = 1
+
+
+class Star(object):
+    def __init__(self, hub, leaves, helper):
+        # hub is a node, leaves a NodeContainer and helper a
+        # PointToPointHelper
+        self.hub = hub
+        self.leaves = leaves
+        self.devices = ns.network.NetDeviceContainer()
+        for i in range(leaves.GetN()):
+            self.devices.Add(helper.Install(hub, leaves.Get(i)))
+        self.allocator = None
+        self.kind = None
+
+    def __len__(self):
+        return self.leaves.GetN()
+
+    def leaf(self, i):
+        return self.leaves.Get(i)
+
+    def leaf_range(self, start, stop):
+        # NodeContainer of leaves start to stop - 1
+        nodes = ns.network.NodeContainer()
+        for i in range(start, stop):
+            nodes.Add(self.leaves.Get(i))
+        return nodes
+
+    def device(self, i, side):
+        # Device of link i on the hub (HUB) or leaf (LEAF) side
+        return self.devices.Get(2 * i + side)
+
+    def link_devices(self, i):
+        link = ns.network.NetDeviceContainer()
+        link.Add(self.device(i, HUB))
+        link.Add(self.device(i, LEAF))
+        return link
+
+    def assign(self, allocator, kind):
+        # Gives every link a subnet of the allocator, as links of the given
+        # kind
+        self.allocator = allocator
+        self.kind = kind
+        for i in range(len(self)):
+            allocator.assign(kind, self.link_devices(i))
+
+    def address(self, i, side):
+        return self.allocator.address(self.kind, i, side)
+
+
+def create_star(hub, count, helper):
+    # Creates count leaves in one container and links them to hub
+    leaves = ns.network.NodeContainer()
+    leaves.Create(count)
+    return Star(hub, leaves, helper)
@@ -0,0 +1,64 @@
+#!/usr/bin/python
+#
+# OnOff applications installed per group of clients.
+#
+# A TrafficClass configures one OnOffHelper (data rate, packet size, on and off
+# times) once and installs it on a whole NodeContainer in one call, all
+# sending to the same address, or on one node once per destination address.
+# The applications of a call are started and stopped together through their
+# ApplicationContainer. Before, the sims built a new helper and set all its
+# attributes for every client.
+#
+# The on and off times are set as random variable strings, from which every
+# application the helper creates is expected to get its own random variables,
+# as with one helper per application. Neither this nor the time saved has been
+# checked with the ns-3 version and bindings the sims use.
+
+import ns.applications
+import ns.core
+import ns.network
+import packet_sinks
+
+PACKET_SIZE = 1500
+
+# On and off times of the sims in seconds
+CONSTANT_ON = "ns3::ConstantRandomVariable[Constant=2]"
+CONSTANT_OFF = "ns3::ConstantRandomVariable[Constant=1]"
+EXPONENTIAL_ON = "ns3::ExponentialRandomVariable[Mean=2]"
+EXPONENTIAL_OFF = "ns3::ExponentialRandomVariable[Mean=1]"
+
+
+def remote(address, port=packet_sinks.DEFAULT_PORT):
+    return ns.network.Address(ns.network.InetSocketAddress(address, port))
+
+
+class TrafficClass(object):
+    def __init__(self, rate, on_time=CONSTANT_ON, off_time=CONSTANT_OFF,
+                 packet_size=PACKET_SIZE, port=packet_sinks.DEFAULT_PORT,
+                 protocol=packet_sinks.TCP_SOCKET_FACTORY):
+        # rate in bit/s, on_time and off_time random variable strings
+        self.port = port
+        self.helper = ns.applications.OnOffHelper(protocol, ns.network.Address())
+        self.helper.SetAttribute("DataRate", ns.network.DataRateValue(ns.network.DataRate(rate)))
+        self.helper.SetAttribute("PacketSize", ns.core.UintegerValue(packet_size))
+        self.helper.SetAttribute("OnTime", ns.core.StringValue(on_time))
+        self.helper.SetAttribute("OffTime", ns.core.StringValue(off_time))
+
+    def _start(self, apps, start_time, stop_time):
+        apps.Start(start_time)
+        apps.Stop(stop_time)
+        return apps
+
+    def install(self, sources, address, start_time, stop_time):
+        # One application on every node of the NodeContainer sources, all
+        # sending to address
+        self.helper.SetAttribute("Remote", ns.network.AddressValue(remote(address, self.port)))
+        return self._start(self.helper.Install(sources), start_time, stop_time)
+
+    def install_to(self, source, addresses, start_time, stop_time):
+        # One application on node source for each of the addresses
+        apps = ns.network.ApplicationContainer()
+        for address in addresses:
+            self.helper.SetAttribute("Remote", ns.network.AddressValue(remote(address, self.port)))
+            apps.Add(self.helper.Install(source))
+        return self._start(apps, start_time, stop_time)